@@ -0,0 +1,237 @@
+"""Benchmarks of the hot endpoints and model methods of the quizzes blueprint.
+
+Generates a synthetic database (or reuses an existing one), runs every scenario through the Flask
+test client and reports p50/p99 latency along with the number of SQL statements per call.
+
+Usage:
+    python benchmarks/bench_quizzes.py --authors 1000 --students 5000 --sessions 100000
+    python benchmarks/bench_quizzes.py --database bench.sqlite --save baseline.json
+    python benchmarks/bench_quizzes.py --database bench.sqlite --compare baseline.json
+"""
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import click
+from flask import g
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datagen import PASSWORD, generate  # noqa: E402
+from quizzer import create_app  # noqa: E402
+from quizzer.db import get_db  # noqa: E402
+from quizzer.quizzes import Quiz, QuizResult  # noqa: E402
+
+
+class StatementCounter:
+    """Counts SQL statements executed by requests and model calls of the app, as recorded by `QueryStats`
+    of their connections. `executemany` is counted as one statement, like it's executed.
+    """
+
+    def __init__(self, app):
+        self.count = 0
+        app.after_request(self.count_request)
+
+    def count_request(self, response):
+        db = g.get("db")
+        if db is not None:
+            self.count += db.stats.count
+        return response
+
+    def count_context(self):
+        """Count statements executed in the current application context."""
+        self.count += get_db().stats.count
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of samples."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def measure(name, iterations, prepare, call, counter):
+    """Run a scenario and collect latency and number of statements of every call.
+
+    :param name: name of the scenario.
+    :param iterations: number of calls.
+    :param prepare: function called before every call, not measured. Its result is passed to the call.
+    :param call: measured function.
+    :param counter: StatementCounter object.
+    :return: dictionary with results of the scenario.
+    """
+    timings, statements = [], []
+    for _ in range(iterations):
+        argument = prepare()
+        counter.count = 0
+        started = time.perf_counter()
+        call(argument)
+        timings.append((time.perf_counter() - started) * 1000)
+        statements.append(counter.count)
+    return {
+        "name": name,
+        "iterations": iterations,
+        "p50_ms": round(percentile(timings, 0.5), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+        "statements": round(statistics.mean(statements), 1),
+    }
+
+
+def expect_ok(response):
+    if response.status_code >= 400:
+        raise click.ClickException(f"{response.request.path} returned {response.status_code}")
+    return response
+
+
+def scenarios(app, users, rnd, counter):
+    """Build benchmark scenarios.
+
+    :return: list of (name, prepare, call) tuples.
+    """
+    author, student = rnd.choice(users["authors"]), rnd.choice(users["students"])
+    author_client, student_client = app.test_client(), app.test_client()
+    expect_ok(author_client.post("/auth/login", data={"username": author, "password": PASSWORD}))
+    expect_ok(student_client.post("/auth/login", data={"username": student, "password": PASSWORD}))
+    with app.app_context():
+        author_id = get_db().execute("SELECT id FROM user WHERE username = ?", (author,)).fetchone()["id"]
+        author_quizzes = [row["id"] for row in Quiz.select_by_author_id(author_id)]
+        scores = [tuple(row) for row in get_db().execute(
+            "SELECT user_id, quiz_id, quiz_session_id FROM quiz_session_score ORDER BY quiz_session_id")]
+
+    def random_quiz():
+        return rnd.randrange(1, users["quizzes"] + 1)
+
+    def quiz_json(quiz_id):
+        with app.app_context():
+            quiz = Quiz.from_quiz_id(quiz_id)
+        questions = {question.text: {option.text: option.checked for option in question.options}
+                     for question in quiz.questions}
+        return quiz, questions
+
+    def prepare_submission():
+        quiz_id = random_quiz()
+        expect_ok(student_client.get(f"/{quiz_id}/solve"))
+        quiz, _ = quiz_json(quiz_id)
+        return quiz_id, {question.question_id: rnd.choice(question.options).answer_id for question in quiz.questions}
+
+    def prepare_edit():
+        quiz_id = rnd.choice(author_quizzes)
+        quiz, questions = quiz_json(quiz_id)
+        first = next(iter(questions))
+        questions[f"{first} (edited {rnd.random()})"] = questions.pop(first)
+        return quiz_id, {quiz.name: questions}
+
+    def model(function):
+        def call(argument):
+            with app.app_context():
+                function(argument)
+                counter.count_context()
+        return call
+
+    def create_data():
+        return {f"Quiz {rnd.random()}": {f"Question {index}": {f"Option {option}": option == 0 for option in range(4)}
+                                         for index in range(20)}}
+
+    return [
+        ("GET / (student)", lambda: None, lambda _: expect_ok(student_client.get("/"))),
+        ("GET / (author)", lambda: None, lambda _: expect_ok(author_client.get("/"))),
+        ("GET /<id>/solve", random_quiz, lambda quiz_id: expect_ok(student_client.get(f"/{quiz_id}/solve"))),
+        ("POST /<id>/solve", prepare_submission,
+         lambda args: expect_ok(student_client.post(f"/{args[0]}/solve", data=args[1]))),
+        ("GET /history (student)", lambda: None, lambda _: expect_ok(student_client.get("/history"))),
+        ("GET /history (author)", lambda: None, lambda _: expect_ok(author_client.get("/history"))),
+        ("POST /create", create_data, lambda data: expect_ok(author_client.post("/create", json=data))),
+        ("POST /<id>/edit", prepare_edit,
+         lambda args: expect_ok(author_client.post(f"/{args[0]}/edit", json=args[1]))),
+        ("Quiz.from_quiz_id", random_quiz, model(lambda quiz_id: Quiz.from_quiz_id(quiz_id))),
+        ("QuizResult.calculate_answers", lambda: rnd.choice(scores),
+         model(lambda score: QuizResult.calculate_answers(user_id=score[0], quiz_id=score[1], session_id=score[2]))),
+    ]
+
+
+def compare(results, baseline_path, tolerance):
+    """Compare results with the baseline.
+
+    :return: list of descriptions of regressions.
+    """
+    with open(baseline_path) as f:
+        baseline = {result["name"]: result for result in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["name"])
+        if previous is None:
+            continue
+        if result["p99_ms"] > previous["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{result['name']}: p99 {previous['p99_ms']} ms -> {result['p99_ms']} ms")
+        if result["statements"] > previous["statements"]:
+            regressions.append(f"{result['name']}: statements {previous['statements']} -> {result['statements']}")
+    return regressions
+
+
+@click.command()
+@click.option("--database", help="Path to the database, generated if it doesn't exist. Temporary by default.")
+@click.option("--regenerate", is_flag=True, help="Generate the database even if it exists.")
+@click.option("--authors", default=100, show_default=True)
+@click.option("--students", default=1000, show_default=True)
+@click.option("--quizzes-per-author", default=5, show_default=True)
+@click.option("--questions", default=20, show_default=True, help="Questions per quiz.")
+@click.option("--options", default=4, show_default=True, help="Answer options per question.")
+@click.option("--sessions", default=10000, show_default=True, help="Submitted quiz sessions.")
+@click.option("--iterations", default=200, show_default=True, help="Calls of every scenario.")
+@click.option("--cache/--no-cache", default=True, show_default=True, help="Use the quiz cache.")
+@click.option("--seed", default=0, show_default=True)
+@click.option("--save", type=click.Path(dir_okay=False), help="Save results as JSON.")
+@click.option("--compare", "baseline", type=click.Path(exists=True, dir_okay=False),
+              help="Fail if results regressed compared to saved JSON.")
+@click.option("--tolerance", default=0.2, show_default=True, help="Allowed relative growth of p99 latency.")
+def main(database, regenerate, authors, students, quizzes_per_author, questions, options, sessions, iterations,
+         cache, seed, save, baseline, tolerance):
+    """Benchmark the quizzes blueprint on a synthetic database."""
+    temp_dir = None
+    if database is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        database = os.path.join(temp_dir.name, "bench.sqlite")
+    app = create_app({"DATABASE": database, "QUIZ_CACHE_BACKEND": "memory" if cache else "null"})
+    counter = StatementCounter(app)
+    users_path = f"{database}.users.json"
+
+    if regenerate or not os.path.exists(database) or not os.path.exists(users_path):
+        with app.app_context():
+            started = time.perf_counter()
+            users = generate(authors=authors, students=students, quizzes_per_author=quizzes_per_author,
+                             questions_per_quiz=questions, options_per_question=options, sessions=sessions,
+                             seed=seed, echo=click.echo)
+            click.echo(f"Generated {users['results']} results in {time.perf_counter() - started:.1f} s.")
+        with open(users_path, "w") as f:
+            json.dump(users, f)
+    else:
+        with open(users_path) as f:
+            users = json.load(f)
+
+    rnd = random.Random(seed)
+    results = [measure(name, iterations, prepare, call, counter)
+               for name, prepare, call in scenarios(app, users, rnd, counter)]
+
+    click.echo(f"{'Scenario':<30} {'p50, ms':>10} {'p99, ms':>10} {'SQL':>8}")
+    for result in results:
+        click.echo(f"{result['name']:<30} {result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f} "
+                   f"{result['statements']:>8}")
+
+    if save:
+        with open(save, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+    if temp_dir is not None:
+        temp_dir.cleanup()
+    if baseline:
+        regressions = compare(results, baseline, tolerance)
+        if regressions:
+            raise click.ClickException("Regressions found:\n" + "\n".join(regressions))
+        click.echo("No regressions found.")
+
+
+if __name__ == "__main__":
+    main()
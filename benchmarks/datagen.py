@@ -0,0 +1,120 @@
+"""Generator of synthetic databases for benchmarks.
+
+Fills a freshly initialized database with authors, students, quizzes and submitted quiz sessions.
+Rows are generated lazily and written with batched inserts, so millions of results don't have to fit
+in memory.
+"""
+import itertools
+import random
+
+from werkzeug.security import generate_password_hash
+
+from quizzer.db import get_db, init_db
+
+PASSWORD = "bench"
+BATCH_SIZE = 10000
+
+
+def _batches(rows, size=BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _insert(db, sql, rows):
+    for batch in _batches(rows):
+        db.executemany(sql, batch)
+
+
+def generate(authors=1000, students=5000, quizzes_per_author=5, questions_per_quiz=20, options_per_question=4,
+             sessions=50000, seed=0, echo=print):
+    """Initialize the database of the current app and fill it with synthetic data.
+
+    Should be called inside of an application context.
+
+    :param authors: number of authors.
+    :param students: number of students.
+    :param quizzes_per_author: number of quizzes of each author.
+    :param questions_per_quiz: number of questions in each quiz.
+    :param options_per_question: number of answer options of each question.
+    :param sessions: number of submitted quiz sessions, each of them adds a result row per question.
+    :param seed: seed of the random generator.
+    :param echo: function to report progress.
+    :return: dictionary with names of generated users and number of generated rows.
+    """
+    init_db()
+    db = get_db()
+    password = generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000")
+    num_quizzes = authors * quizzes_per_author
+    num_questions = num_quizzes * questions_per_quiz
+    user_ids = range(2, 2 + authors + students)
+
+    def user_rows():
+        for user_id in user_ids:
+            is_admin = user_id < 2 + authors
+            yield user_id, f"{'author' if is_admin else 'student'}{user_id}", password, int(is_admin)
+
+    def question_id(quiz_id, index):
+        return (quiz_id - 1) * questions_per_quiz + index + 1
+
+    def answer_id(question, index):
+        return (question - 1) * options_per_question + index + 1
+
+    def real_answer_id(question):
+        return answer_id(question, question % options_per_question)
+
+    echo(f"Generating {authors} authors, {students} students and {num_quizzes} quizzes...")
+    _insert(db, "INSERT INTO user (id, username, password, is_admin) VALUES (?, ?, ?, ?)", user_rows())
+    _insert(db, "INSERT INTO quizzes (id, name, author_id) VALUES (?, ?, ?)",
+            ((quiz_id, f"Quiz {quiz_id}", 2 + (quiz_id - 1) // quizzes_per_author)
+             for quiz_id in range(1, num_quizzes + 1)))
+    _insert(db, "INSERT INTO answer_options (id, text) VALUES (?, ?)",
+            ((option_id, f"Option {option_id}") for option_id in range(1, num_questions * options_per_question + 1)))
+    _insert(db, "INSERT INTO questions (id, answer_id, text) VALUES (?, ?, ?)",
+            ((question, real_answer_id(question), f"Question {question}")
+             for question in range(1, num_questions + 1)))
+    _insert(db, "INSERT INTO question_answer_rel (question_id, answer_option_id) VALUES (?, ?)",
+            ((question, answer_id(question, index))
+             for question in range(1, num_questions + 1) for index in range(options_per_question)))
+    _insert(db, "INSERT INTO quiz_question_rel (quiz_id, question_id) VALUES (?, ?)",
+            ((quiz_id, question_id(quiz_id, index))
+             for quiz_id in range(1, num_quizzes + 1) for index in range(questions_per_quiz)))
+
+    echo(f"Generating {sessions} quiz sessions with {sessions * questions_per_quiz} results...")
+    if not students or not num_quizzes:
+        sessions = 0
+
+    def session_rows():
+        """Yield (session ID, user ID, quiz ID, answered option indexes) of every session, the same for every run."""
+        for session_id in range(1, sessions + 1):
+            rnd = random.Random(seed * 1000003 + session_id)
+            yield (session_id, rnd.randrange(2 + authors, 2 + authors + students), rnd.randrange(1, num_quizzes + 1),
+                   [rnd.randrange(options_per_question) for _ in range(questions_per_quiz)])
+
+    _insert(db, "INSERT INTO quiz_session (id, user_id, quiz_id, status) VALUES (?, ?, ?, 'completed')",
+            ((session_id, user_id, quiz_id) for session_id, user_id, quiz_id, _ in session_rows()))
+    _insert(db, """INSERT INTO quiz_result (user_id, quiz_session_id, quiz_id, question_id, answer_id)
+                VALUES (?, ?, ?, ?, ?)""",
+            ((user_id, session_id, quiz_id, question_id(quiz_id, index),
+              answer_id(question_id(quiz_id, index), answer))
+             for session_id, user_id, quiz_id, answers in session_rows()
+             for index, answer in enumerate(answers)))
+    _insert(db, """INSERT INTO quiz_session_score (user_id, quiz_session_id, quiz_id, correct_answers, total_answers)
+                VALUES (?, ?, ?, ?, ?)""",
+            ((user_id, session_id, quiz_id,
+              sum(answer_id(question_id(quiz_id, index), answer) == real_answer_id(question_id(quiz_id, index))
+                  for index, answer in enumerate(answers)),
+              questions_per_quiz)
+             for session_id, user_id, quiz_id, answers in session_rows()))
+    db.commit()
+    db.execute("ANALYZE")
+
+    return {
+        "authors": [f"author{user_id}" for user_id in user_ids[:authors]],
+        "students": [f"student{user_id}" for user_id in user_ids[authors:]],
+        "quizzes": num_quizzes,
+        "results": sessions * questions_per_quiz,
+    }
@@ -0,0 +1,56 @@
+"""Configuration of gunicorn for `gunicorn -c gunicorn.conf.py quizzer.wsgi:app`.
+
+Settings are taken from the environment, so containers can be scaled without rebuilding the image.
+Number of reverse proxies in front of gunicorn is set by `FORWARDED_HOPS`, none by default, see `quizzer.wsgi`.
+
+The app is preloaded in the master process, so HUP replaces the workers with forks of the same code and only
+re-reads this file. To deploy new code without dropping requests, send USR2 to the master to start a new master
+with new workers, then QUIT to the old master once the new workers are up.
+"""
+import multiprocessing
+import os
+import tempfile
+
+port = os.environ.get("PORT", "8000")
+bind = f"0.0.0.0:{port}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("PYTHON_THREADS", 4))
+worker_class = "gthread"
+timeout = int(os.environ.get("WORKER_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+max_requests = int(os.environ.get("MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+# The app is created, migrated and it's templates are compiled once in the master process before fork.
+preload_app = True
+accesslog = "-"
+# Workers write snapshots of their metrics to a shared directory, so `/metrics` reports all of them.
+# It's set before the app is preloaded, the new master started by USR2 inherits it.
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), f"quizzer-metrics-{port}"))
+
+
+def post_fork(server, worker):
+    from quizzer.db import dispose_pool
+    from quizzer.warmup import warm_up_worker
+    from quizzer.wsgi import app
+
+    dispose_pool(app)
+    warm_up_worker(app)
+
+
+def on_starting(server):
+    from quizzer.metrics import archive_stale_snapshots
+    from quizzer.wsgi import app
+
+    directory = app.extensions["metrics"].directory
+    if directory:
+        archive_stale_snapshots(directory)
+
+
+def worker_exit(server, worker):
+    from quizzer.wsgi import app
+
+    writer = app.extensions.get("result_writer")
+    if writer is not None:
+        writer.drain()
+    app.extensions["metrics"].retire()
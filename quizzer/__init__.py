@@ -14,6 +14,41 @@ def create_app(test_config=None):
     app.config.from_mapping(
         SECRET_KEY="dev",
         DATABASE=os.path.join(app.instance_path, "quizzer.sqlite"),
+        DATABASE_POOL_SIZE=8,
+        DATABASE_PRAGMAS={},
+        SQL_SLOW_QUERY_MS=100,
+        SQL_DEBUG_HEADER=False,
+        PAGE_SIZE=50,
+        API_MAX_PAGE_SIZE=1000,
+        QUIZ_CACHE_BACKEND="memory",
+        QUIZ_CACHE_SIZE=256,
+        QUIZ_CACHE_TTL=600,
+        QUIZ_CACHE_DIR=os.path.join(app.instance_path, "cache"),
+        QUIZ_SESSION_TIMEOUT=3 * 60 * 60,
+        USER_CACHE_SIZE=4096,
+        USER_CACHE_TTL=10,
+        PASSWORD_HASH_METHOD="pbkdf2:sha256:150000",
+        PASSWORD_SALT_LENGTH=8,
+        PASSWORD_HASH_WORKERS=None,
+        LOGIN_RATE_LIMIT=100,
+        LOGIN_RATE_PERIOD=60,
+        LOGIN_FAILURE_LIMIT=10,
+        LOGIN_FAILURE_PERIOD=300,
+        METRICS_ENABLED=False,
+        METRICS_TOKEN=None,
+        METRICS_DIR=os.environ.get("METRICS_DIR"),
+        METRICS_FLUSH_INTERVAL=1.0,
+        FRAGMENT_CACHE_SIZE=1024,
+        TEMPLATE_BYTECODE_CACHE_DIR=None,
+        TEMPLATE_PRECOMPILE=False,
+        COMPRESS_RESPONSES=True,
+        ASGI_THREADS=32,
+        MAX_CONTENT_LENGTH=16 * 1024 * 1024,
+        RESULT_WRITE_BEHIND=False,
+        RESULT_WRITE_BATCH_SIZE=100,
+        RESULT_WRITE_INTERVAL=0.5,
+        RESULT_WRITE_QUEUE_SIZE=10000,
+        RESULT_SPILL_FILE=os.path.join(app.instance_path, "result_spill.ndjson"),
     )
 
     if test_config is None:
@@ -26,17 +61,27 @@ def create_app(test_config=None):
     except OSError:
         pass
 
-    from quizzer import db
+    from quizzer import cache, db, metrics
 
     db.init_app(app)
+    cache.init_app(app)
+    metrics.init_app(app)
 
-    from quizzer import auth, quizzes
+    from quizzer import api, archive, auth, export, health, quizzes, writer
 
+    archive.init_app(app)
+    export.init_app(app)
+    writer.init_app(app)
     app.register_blueprint(auth.bp)
     app.register_blueprint(quizzes.bp)
+    app.register_blueprint(api.bp)
+    app.register_blueprint(health.bp)
     app.add_url_rule("/", endpoint="index")
 
-    from quizzer.localization import locale
-    app.jinja_env.globals['get_locale'] = locale
+    from quizzer import assets, localization, templating
+
+    assets.init_app(app)
+    localization.init_app(app)
+    templating.init_app(app)
 
     return app
@@ -0,0 +1,164 @@
+import functools
+
+from flask import Blueprint, Response, abort, current_app, g, jsonify, request, stream_with_context
+from werkzeug.exceptions import HTTPException
+
+from quizzer.export import FORMATS, RESULT_FIELDS, parse_time, row_to_dict
+from quizzer.metrics import get_metrics
+from quizzer.quizzes import Quiz, QuizResult, paginate
+
+bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+QUIZ_FIELDS = ("id", "name", "author_id", "author_name", "version")
+
+
+def api_login_required(view):
+    """View decorator that responds with `401 Unauthorized` to anonymous users."""
+
+    @functools.wraps(view)
+    def wrapped_view(**kwargs):
+        if g.user is None:
+            abort(401)
+
+        return view(**kwargs)
+
+    return wrapped_view
+
+
+@bp.errorhandler(HTTPException)
+def handle_http_error(error):
+    """Respond with JSON errors instead of HTML pages."""
+    response = jsonify(error=error.name, message=error.description)
+    response.status_code = error.code
+    return response
+
+
+def page_args():
+    """Get pagination arguments of the API request.
+
+    :return: tuple of (text to search, cursor of the page, number of items on the page)
+    """
+    cursor = request.args.get("cursor", type=int)
+    limit = request.args.get("limit", current_app.config["PAGE_SIZE"], type=int)
+    if limit < 1 or limit > current_app.config["API_MAX_PAGE_SIZE"]:
+        abort(400, f"limit should be between 1 and {current_app.config['API_MAX_PAGE_SIZE']}")
+    return request.args.get("q", "").strip() or None, cursor, limit
+
+
+def field_args(available):
+    """Get fields requested with `fields` argument as a comma-separated list, all available fields by default.
+
+    :param available: names of fields that can be requested.
+    :return: tuple of field names.
+    """
+    fields = request.args.get("fields")
+    if not fields:
+        return available
+    fields = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+@bp.route("/quizzes")
+@api_login_required
+def list_quizzes():
+    """List quizzes of the author or quizzes available to the student, newest first."""
+    search, cursor, limit = page_args()
+    fields = field_args(QUIZ_FIELDS)
+    if g.is_admin:
+        quizzes = Quiz.select_by_author_id(author_id=g.user['id'], search=search, cursor=cursor, limit=limit + 1)
+    else:
+        quizzes = Quiz.select_available_to_solve(search=search, cursor=cursor, limit=limit + 1)
+    quizzes, next_cursor = paginate(quizzes, limit)
+    return jsonify(items=[row_to_dict(quiz, fields) for quiz in quizzes], next_cursor=next_cursor)
+
+
+@bp.route("/quizzes/<int:quiz_id>")
+@api_login_required
+def get_quiz(quiz_id):
+    """Get quiz with it's questions. Real answers are shown only to the author of the quiz."""
+    quiz = Quiz.from_quiz_id(quiz_id)
+    if g.is_admin and quiz.author_id != g.user['id']:
+        abort(403)
+    quiz_dict = quiz.to_dict(with_answers=quiz.author_id == g.user['id'])
+    fields = field_args(tuple(quiz_dict))
+    return jsonify({field: quiz_dict[field] for field in fields})
+
+
+@bp.route("/quizzes/<int:quiz_id>/submissions", methods=("POST",))
+@api_login_required
+def submit_answers(quiz_id):
+    """Submit answers to the quiz as `{"answers": {"<question ID>": <answer ID>, ...}}` and get the score."""
+    quiz = Quiz.from_quiz_id(quiz_id)
+    if g.is_admin:
+        abort(403)
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("answers"), dict):
+        abort(400, "Answers should be sent as a JSON object {\"answers\": {\"<question ID>\": <answer ID>}}")
+    answers = [(str(question_id), str(answer_id)) for question_id, answer_id in data["answers"].items()]
+    errors = quiz.validate_answers(answers)
+    if errors:
+        return jsonify(error="Bad Request", message=errors), 400
+
+    # The submission gets it's own quiz session, a quiz which is being solved in the browser is kept.
+    session_id = Quiz.create_session_for_user(g.user['id'], quiz_id=quiz.quiz_id)
+    correct_answers, total_answers = quiz.write_answer_results(user_id=g.user['id'], answers=answers,
+                                                               session_id=session_id)
+    get_metrics().counter("quizzer_submissions_total", "Accepted quiz submissions.").inc()
+    return jsonify(session_id=session_id, correct_answers=correct_answers, total_answers=total_answers), 201
+
+
+@bp.route("/results")
+@api_login_required
+def list_results():
+    """List scores of quiz sessions, in order the sessions were submitted."""
+    search, cursor, limit = page_args()
+    fields = field_args(RESULT_FIELDS)
+    if g.is_admin:
+        results = QuizResult.get_session_results_for_author(author_id=g.user['id'], search=search, cursor=cursor,
+                                                            limit=limit + 1)
+    else:
+        results = QuizResult.get_session_results_for_user(user_id=g.user['id'], search=search, cursor=cursor,
+                                                          limit=limit + 1)
+    results, next_cursor = paginate(results, limit)
+    return jsonify(items=[row_to_dict(result, fields) for result in results], next_cursor=next_cursor)
+
+
+def export_filters():
+    """Get filters of the export from arguments of the request.
+
+    Authors export results of their quizzes, optionally of a single student, students export their own results.
+
+    :return: dictionary of arguments for `QuizResult.iter_session_results`.
+    """
+    filters = {"quiz_id": request.args.get("quiz_id", type=int)}
+    if g.is_admin:
+        filters.update(author_id=g.user['id'], user_id=request.args.get("student_id", type=int))
+    else:
+        filters.update(user_id=g.user['id'])
+    try:
+        filters.update(since=parse_time(request.args["since"]) if request.args.get("since") else None,
+                       until=parse_time(request.args["until"], end=True) if request.args.get("until") else None)
+    except ValueError as e:
+        abort(400, str(e))
+    return filters
+
+
+@bp.route("/results/export")
+@api_login_required
+def export_results():
+    """Stream scores of quiz sessions as CSV or newline-delimited JSON, selected by `format` argument.
+
+    Results can be filtered by `quiz_id`, `student_id` and `since`/`until` dates.
+    Rows are read from the database while the response is sent, so the export is never built in memory.
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in FORMATS:
+        abort(400, f"format should be one of: {', '.join(FORMATS)}")
+    fields = field_args(RESULT_FIELDS)
+    rows = QuizResult.iter_session_results(cursor=request.args.get("cursor", type=int), **export_filters())
+    mimetype, generate = FORMATS[export_format]
+    return Response(stream_with_context(generate(rows, fields)), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename=results.{export_format}"})
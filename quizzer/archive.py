@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+
+import click
+from flask.cli import with_appcontext
+
+from quizzer.db import get_db
+from quizzer.quizzes import Quiz
+
+
+def read_quizzes(lines, author_id):
+    """Parse quizzes from lines of newline-delimited JSON, one quiz per line in the format of the create page.
+
+    :param lines: iterable of lines.
+    :param author_id: author ID of the quizzes.
+    :return: generator of (line number, Quiz object) tuples.
+    :raise click.ClickException: if a quiz is not valid.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            quiz = Quiz.from_dict(author_id, json.loads(line))
+        except ValueError as e:
+            raise click.ClickException(f"Line {line_number}: {e}")
+        errors = quiz.validate_content()
+        if errors:
+            raise click.ClickException(f"Line {line_number}: {' '.join(errors)}")
+        yield line_number, quiz
+
+
+def import_quizzes(lines, author_id, batch_size=500, on_batch=None):
+    """Import quizzes from lines of newline-delimited JSON in batches, every batch in a single transaction.
+
+    :param lines: iterable of lines.
+    :param author_id: author ID of the quizzes.
+    :param batch_size: number of quizzes in a transaction.
+    :param on_batch: function that is called with the number of quizzes after every imported batch.
+    :return: number of imported quizzes.
+    """
+    imported, batch = 0, []
+    for _, quiz in read_quizzes(lines, author_id):
+        batch.append(quiz)
+        if len(batch) >= batch_size:
+            imported += _import_batch(batch, on_batch)
+            batch = []
+    if batch:
+        imported += _import_batch(batch, on_batch)
+    return imported
+
+
+def _import_batch(quizzes, on_batch):
+    Quiz.add_many_to_db(quizzes)
+    if on_batch:
+        on_batch(len(quizzes))
+    return len(quizzes)
+
+
+def get_author_id(username):
+    """Get ID of the author by username.
+
+    :param username: username of the author.
+    :return: user ID.
+    :raise click.BadParameter: if there is no such author.
+    """
+    user = get_db().execute("SELECT id, is_admin FROM user WHERE username = ?", (username,)).fetchone()
+    if user is None or not user["is_admin"]:
+        raise click.BadParameter(f"Author {username} does not exist", param_hint="--author")
+    return user["id"]
+
+
+@click.command("import-quizzes")
+@click.argument("archive", type=click.File("r", encoding="utf8"))
+@click.option("--author", required=True, help="Username of the author of imported quizzes.")
+@click.option("--batch-size", type=click.IntRange(min=1), default=500, show_default=True,
+              help="Number of quizzes imported in a single transaction.")
+@with_appcontext
+def import_quizzes_command(archive, author, batch_size):
+    """Import quizzes from ARCHIVE of newline-delimited JSON, one quiz per line in the format of the create page.
+
+    Use - as ARCHIVE to read from the standard input. Import stops at the first invalid quiz,
+    quizzes of the previous batches stay imported.
+    """
+    author_id = get_author_id(author)
+    if archive.name == "<stdin>":
+        imported = import_quizzes(archive, author_id, batch_size=batch_size,
+                                  on_batch=lambda count: click.echo(f"Imported {count} quizzes.", err=True))
+    else:
+        with click.progressbar(length=os.path.getsize(archive.name), label="Importing quizzes",
+                               file=sys.stderr) as bar:
+            def lines():
+                for line in archive:
+                    yield line
+                    bar.update(len(line.encode("utf8")))
+
+            imported = import_quizzes(lines(), author_id, batch_size=batch_size)
+    click.echo(f"Imported {imported} quizzes.")
+
+
+@click.command("export-quizzes")
+@click.argument("archive", type=click.File("w", encoding="utf8"), default="-")
+@click.option("--author", help="Username of the author, quizzes of all authors by default.")
+@with_appcontext
+def export_quizzes_command(archive, author):
+    """Export quizzes to ARCHIVE of newline-delimited JSON, standard output by default.
+
+    Every line is a quiz in the format of the create page, so the archive can be loaded with `import-quizzes`.
+    """
+    if author:
+        quiz_ids = get_db().execute("SELECT id FROM quizzes WHERE author_id = ? ORDER BY id",
+                                    (get_author_id(author),)).fetchall()
+    else:
+        quiz_ids = get_db().execute("SELECT id FROM quizzes ORDER BY id").fetchall()
+    with click.progressbar([row["id"] for row in quiz_ids], label="Exporting quizzes",
+                           file=sys.stderr) as bar:
+        for quiz_id in bar:
+            archive.write(json.dumps(Quiz.from_quiz_id(quiz_id).to_create_dict(), ensure_ascii=False) + "\n")
+
+
+def init_app(app):
+    """Register import and export commands of quizzes with the Flask app. This is called by the application factory."""
+    app.cli.add_command(import_quizzes_command)
+    app.cli.add_command(export_quizzes_command)
@@ -0,0 +1,192 @@
+"""ASGI entry point, e.g. `uvicorn --factory quizzer.asgi:create_application`.
+
+Connections are served by the event loop: request bodies are received and responses are sent asynchronously,
+so slow clients don't hold a thread. Views, including their database access through `get_db`, run on a bounded
+pool of threads only while the request is processed. Templates and views are the same as in the WSGI mode.
+
+This mode doesn't raise the number of requests processed at the same time: it's still limited by `ASGI_THREADS`,
+as views and the database access are synchronous. Request bodies are buffered in memory, so they are limited
+by `MAX_CONTENT_LENGTH`.
+"""
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_END = object()
+
+
+def build_environ(scope, body):
+    """Build WSGI environment of the HTTP request.
+
+    :param scope: ASGI connection scope.
+    :param body: body of the request.
+    :return: WSGI environment dictionary.
+    """
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name, value = name.decode("latin1").upper().replace("-", "_"), value.decode("latin1")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        if name in environ:
+            # Cookies are separated by semicolons, while other headers are comma-separated lists
+            value = f"{environ[name]}; {value}" if name == "HTTP_COOKIE" else f"{environ[name]},{value}"
+        environ[name] = value
+    # The body is already received, so it's length is known even for chunked requests
+    environ["CONTENT_LENGTH"] = str(len(body))
+    environ.pop("HTTP_TRANSFER_ENCODING", None)
+    return environ
+
+
+class AsgiAdapter:
+    """Serves WSGI application over ASGI, running the application on a bounded pool of threads."""
+
+    def __init__(self, wsgi_app, max_workers=32, queue_size=8, max_body_size=None):
+        """Class initialization.
+
+        :param wsgi_app: WSGI application, e.g. Flask app.
+        :param max_workers: maximum number of requests processed at the same time.
+        :param queue_size: maximum number of chunks of a response waiting to be sent to the client.
+        :param max_body_size: maximum size of a request body in bytes, larger requests get `413 Payload Too Large`.
+        """
+        self.wsgi_app = wsgi_app
+        self.queue_size = queue_size
+        self.max_body_size = max_body_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quizzer-asgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def shutdown(self):
+        """Wait for requests in progress and write queued results."""
+        self.executor.shutdown(wait=True)
+        writer = getattr(self.wsgi_app, "extensions", {}).get("result_writer")
+        if writer is not None:
+            writer.drain()
+
+    async def _http(self, scope, receive, send):
+        content_length = dict(scope.get("headers", [])).get(b"content-length", b"")
+        if self.max_body_size is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._send_error(send, 413)
+            return
+        body, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.append(message.get("body", b""))
+            size += len(body[-1])
+            if self.max_body_size is not None and size > self.max_body_size:
+                await self._send_error(send, 413)
+                return
+            if not message.get("more_body"):
+                break
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        cancelled = threading.Event()
+        environ = build_environ(scope, b"".join(body))
+
+        def put(item):
+            if not cancelled.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def run():
+            response_start = []
+
+            def start_response(status, headers, exc_info=None):
+                response_start[:] = [int(status.split(" ", 1)[0]),
+                                     [(name.lower().encode("latin1"), value.encode("latin1"))
+                                      for name, value in headers]]
+
+            try:
+                result = self.wsgi_app(environ, start_response)
+                started = False
+                try:
+                    for chunk in result:
+                        if cancelled.is_set():
+                            break
+                        if chunk:
+                            if not started:
+                                put(response_start)
+                                started = True
+                            put(chunk)
+                    if not started:
+                        put(response_start)
+                finally:
+                    if hasattr(result, "close"):
+                        result.close()
+            finally:
+                put(_END)
+
+        future = loop.run_in_executor(self.executor, run)
+        try:
+            start = await queue.get()
+            if start is _END:
+                # The application failed before it started the response
+                await self._send_error(send, 500)
+                return
+            status, headers = start
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            while True:
+                chunk = await queue.get()
+                if chunk is _END:
+                    break
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            cancelled.set()
+            while not future.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+            await future
+
+    @staticmethod
+    async def _send_error(send, status):
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def create_application():
+    """Create and warm up the app for serving over ASGI."""
+    from quizzer import create_app
+    from quizzer.warmup import warm_up
+
+    app = create_app()
+    warm_up(app)
+    return AsgiAdapter(app, max_workers=app.config["ASGI_THREADS"], max_body_size=app.config["MAX_CONTENT_LENGTH"])
@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+import os
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, responses are compressed with gzip only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"text/html", "text/css", "text/plain", "text/csv", "application/javascript",
+                          "application/json", "application/manifest+json", "image/svg+xml"}
+MIN_COMPRESS_SIZE = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _fingerprint(path):
+    with open(path, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()[:12]
+
+
+def static_fingerprint(filename):
+    """Get fingerprint of the content of the static file, computed once per process.
+
+    :param filename: path of the file relative to the static folder.
+    :return: fingerprint or None if the file doesn't exist.
+    """
+    fingerprints = current_app.extensions["static_fingerprints"]
+    if filename not in fingerprints:
+        path = os.path.join(current_app.static_folder, filename)
+        fingerprints[filename] = _fingerprint(path) if os.path.isfile(path) else None
+    return fingerprints[filename]
+
+
+def templates_version(app):
+    """Get fingerprint of all templates of the app, so cached pages are revalidated after templates change.
+
+    :param app: Flask app.
+    :return: fingerprint of the templates.
+    """
+    digest = hashlib.md5()
+    for name in sorted(app.jinja_env.list_templates()):
+        source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, name)
+        digest.update(name.encode("utf8"))
+        digest.update(source.encode("utf8"))
+    return digest.hexdigest()[:12]
+
+
+def add_static_fingerprint(endpoint, values):
+    """Add `v` argument with the fingerprint of the file to URLs of static files."""
+    if endpoint == "static" and "v" not in values:
+        fingerprint = static_fingerprint(values.get("filename", ""))
+        if fingerprint:
+            values["v"] = fingerprint
+
+
+def cache_static(response):
+    """Let browsers cache fingerprinted static files forever, their URLs change along with the content."""
+    if request.endpoint == "static" and response.status_code == 200 and request.args.get("v") and \
+            request.args["v"] == static_fingerprint(request.view_args["filename"]):
+        response.headers["Cache-Control"] = f"public, max-age={365 * 24 * 60 * 60}, immutable"
+    return response
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response):
+    """Compress the response with brotli or gzip if the client accepts it.
+
+    Compressed static files are kept in memory, since they are the same for every client.
+    """
+    if response.status_code != 200 or response.mimetype not in COMPRESSIBLE_MIMETYPES or \
+            "Content-Encoding" in response.headers or (response.is_streamed and not response.direct_passthrough):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(["br", "gzip"] if brotli else ["gzip"])
+    if encoding is None:
+        return response
+
+    response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+    if request.endpoint == "static":
+        cache = current_app.extensions["static_compressed"]
+        key = (request.view_args["filename"], static_fingerprint(request.view_args["filename"]), encoding)
+        if key not in cache:
+            cache[key] = _compress(data, encoding)
+        compressed = cache[key]
+    else:
+        compressed = _compress(data, encoding)
+
+    response.set_data(compressed)
+    # Compressed bytes differ from the original ones, so the ETag becomes weak; conditional requests still match
+    # it by weak comparison regardless of the encoding.
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app):
+    """Register fingerprinting, caching and compression of responses with the Flask app.
+    This is called by the application factory.
+    """
+    app.extensions["static_fingerprints"] = {}
+    app.extensions["static_compressed"] = {}
+    app.extensions["templates_version"] = templates_version(app)
+    app.url_defaults(add_static_fingerprint)
+    app.after_request(cache_static)
+    if app.config["COMPRESS_RESPONSES"]:
+        app.after_request(compress_response)
@@ -1,11 +1,13 @@
 import functools
+import math
 
-from flask import Blueprint, flash, g, redirect, render_template, request, session, url_for
-from werkzeug.security import check_password_hash
-from werkzeug.security import generate_password_hash
+from flask import Blueprint, current_app, flash, g, redirect, render_template, request, session, url_for
 
+from quizzer.cache import LRUCache
 from quizzer.db import get_db
 from quizzer.localization import locale
+from quizzer.passwords import get_password_hasher
+from quizzer.ratelimit import RateLimiter
 
 bp = Blueprint("auth", __name__, url_prefix="/auth")
 
@@ -23,22 +25,109 @@ def login_required(view):
     return wrapped_view
 
 
+def _get_limiter(name, limit, period):
+    limiter = current_app.extensions.get(name)
+    if limiter is None:
+        limiter = current_app.extensions.setdefault(name, RateLimiter(
+            capacity=current_app.config[limit], period=current_app.config[period],
+        ))
+    return limiter
+
+
+def rate_limited(template_name):
+    """View decorator that limits POST requests to protect CPU spent on passwords and to stop password guessing.
+
+    Every request takes a token from the bucket of the client's IP address. Failed attempts are limited
+    by IP address and username as well: a token is taken up front and given back if the view doesn't set
+    `g.failed_attempt`, so parallel requests can't get past the limit.
+
+    :param template_name: template to render with an error if the limit is exceeded.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped_view(**kwargs):
+            if request.method != "POST" or not current_app.config["LOGIN_RATE_LIMIT"]:
+                return view(**kwargs)
+
+            ip_limiter = _get_limiter("login_rate_limiter", "LOGIN_RATE_LIMIT", "LOGIN_RATE_PERIOD")
+            failure_limiter = _get_limiter("login_failure_limiter", "LOGIN_FAILURE_LIMIT", "LOGIN_FAILURE_PERIOD")
+            failure_key = (request.remote_addr, request.form.get("username", ""))
+            wait = ip_limiter.acquire(request.remote_addr)
+            if not wait:
+                wait = failure_limiter.acquire(failure_key)
+            if wait:
+                flash(locale.error_too_many_attempts)
+                return render_template(template_name), 429, {"Retry-After": str(math.ceil(wait))}
+
+            response = view(**kwargs)
+            if not g.get("failed_attempt"):
+                failure_limiter.refund(failure_key)
+            return response
+
+        return wrapped_view
+
+    return decorator
+
+
+# Endpoints that don't depend on the user, so the user is not loaded for them.
+ANONYMOUS_ENDPOINTS = {"static", "locale_script", "metrics", "health.liveness", "health.readiness"}
+
+
+def get_user_cache():
+    """Get the cache of users of the current application, creating it on the first use."""
+    cache = current_app.extensions.get("user_cache")
+    if cache is None:
+        cache = current_app.extensions.setdefault("user_cache", LRUCache(
+            size=current_app.config["USER_CACHE_SIZE"], ttl=current_app.config["USER_CACHE_TTL"],
+        ))
+    return cache
+
+
+def get_user(user_id):
+    """Get ID, username and admin flag of the user, cached in the process for USER_CACHE_TTL seconds.
+
+    Changes made by this process are seen right away, since they call `invalidate_user`. Other processes
+    keep the cached user until the entry expires, so USER_CACHE_TTL is how long a change of the user, e.g.
+    of the admin flag, may take to apply everywhere.
+
+    :param user_id: user ID.
+    :return: dictionary with `id`, `username` and `is_admin` keys or None if the user doesn't exist.
+    """
+    cache = get_user_cache()
+    user = cache.get(user_id)
+    if user is None:
+        row = get_db().execute("SELECT id, username, is_admin FROM user WHERE id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        user = dict(row)
+        cache.set(user_id, user)
+    return user
+
+
+def invalidate_user(user_id):
+    """Drop the cached user after it's changed, other processes see the change when their entry expires.
+
+    :param user_id: user ID.
+    """
+    get_user_cache().delete(user_id)
+
+
 @bp.before_app_request
 def load_logged_in_user():
-    """If a user id is stored in the session, load the user object from the database into ``g.user``."""
-    user_id = session.get("user_id")
+    """If a user id is stored in the session, load the user object into ``g.user``."""
+    user_id = session.get("user_id") if request.endpoint not in ANONYMOUS_ENDPOINTS else None
 
     if user_id is None:
         g.user = None
         g.is_admin = False
     else:
-        g.user = (
-            get_db().execute("SELECT * FROM user WHERE id = ?", (user_id,)).fetchone()
-        )
+        g.user = get_user(user_id)
         g.is_admin = True if (g.user is not None and g.user['is_admin'] == 1) else False
 
 
 @bp.route("/register", methods=("GET", "POST"))
+@rate_limited("auth/register.html")
 def register():
     """Register a new user.
 
@@ -59,19 +148,24 @@ def register():
         if error is None:
             db.execute(
                 "INSERT INTO user (username, password) VALUES (?, ?)",
-                (username, generate_password_hash(password)),
+                (username, get_password_hasher().hash(password)),
             )
             db.commit()
             return redirect(url_for("auth.login"))
 
+        g.failed_attempt = True
         flash(error)
 
     return render_template("auth/register.html")
 
 
 @bp.route("/login", methods=("GET", "POST"))
+@rate_limited("auth/login.html")
 def login():
-    """Log in a registered user by adding the user id to the session."""
+    """Log in a registered user by adding the user id to the session.
+
+    Password of the user is hashed again if it was hashed with outdated parameters.
+    """
     if request.method == "POST":
         username, password = request.form["username"], request.form["password"]
         db = get_db()
@@ -80,16 +174,23 @@ def login():
             "SELECT * FROM user WHERE username = ?", (username,)
         ).fetchone()
 
+        hasher = get_password_hasher()
         if user is None:
             error = locale.error_incorrect_username
-        elif not check_password_hash(user["password"], password):
+        elif not hasher.check(user["password"], password):
             error = locale.error_incorrect_password
 
         if error is None:
+            if hasher.needs_rehash(user["password"]):
+                db.execute("UPDATE user SET password = ? WHERE id = ?", (hasher.hash(password), user["id"]))
+                db.commit()
+            # The user is loaded from the database on log in, so a relogin applies changes made by other processes
+            invalidate_user(user["id"])
             session.clear()
             session["user_id"] = user["id"]
             return redirect(url_for("index"))
 
+        g.failed_attempt = True
         flash(error)
 
     return render_template("auth/login.html")
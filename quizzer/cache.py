@@ -0,0 +1,178 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class LRUCache:
+    """In-process cache that evicts least recently used entries and expires entries after TTL."""
+
+    def __init__(self, size=256, ttl=None):
+        """Class initialization.
+
+        :param size: maximum number of entries.
+        :param ttl: time to live of entries in seconds, None to keep entries until they are evicted.
+        """
+        self.size = size
+        self.ttl = ttl
+        self.hits, self.misses = 0, 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get value of the entry.
+
+        :param key: key of the entry.
+        :return: value of the entry or None if it's missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """Set value of the entry, evicting least recently used entries if the cache is full.
+
+        :param key: key of the entry.
+        :param value: value of the entry.
+        """
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove the entry from the cache.
+
+        :param key: key of the entry.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Get statistics of the cache.
+
+        :return: dictionary with number of hits, misses and entries.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class FileSystemCache(LRUCache):
+    """Cache that stores pickled entries in a directory, so it can be shared by worker processes of a host.
+
+    It's a local stand-in for a shared cache server. Entries are evicted by the time they were stored.
+    """
+
+    def __init__(self, directory, size=256, ttl=None):
+        """Class initialization.
+
+        :param directory: path to the directory for entries.
+        :param size: maximum number of entries.
+        :param ttl: time to live of entries in seconds, None to keep entries until they are evicted.
+        """
+        super().__init__(size=size, ttl=ttl)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode("utf8")).hexdigest() + ".cache")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if self.ttl and os.path.getmtime(path) + self.ttl < time.time():
+                raise FileNotFoundError(path)
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        """Remove the oldest entries if there are more entries than the size of the cache."""
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".cache")]
+        if len(entries) <= self.size:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.size]:
+            self._remove(entry.path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def delete(self, key):
+        self._remove(self._path(key))
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".cache"):
+                self._remove(entry.path)
+
+    def stats(self):
+        size = len([entry for entry in os.scandir(self.directory) if entry.name.endswith(".cache")])
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+class NullCache(LRUCache):
+    """Cache that stores nothing, to disable caching."""
+
+    def __init__(self, size=0, ttl=None):
+        super().__init__(size=0, ttl=ttl)
+
+    def set(self, key, value):
+        pass
+
+
+BACKENDS = {
+    "memory": lambda app: LRUCache(size=app.config["QUIZ_CACHE_SIZE"], ttl=app.config["QUIZ_CACHE_TTL"]),
+    "filesystem": lambda app: FileSystemCache(directory=app.config["QUIZ_CACHE_DIR"],
+                                              size=app.config["QUIZ_CACHE_SIZE"], ttl=app.config["QUIZ_CACHE_TTL"]),
+    "null": lambda app: NullCache(),
+}
+
+
+def get_quiz_cache():
+    """Get the cache of built quizzes of the current application."""
+    return current_app.extensions["quiz_cache"]
+
+
+def init_app(app):
+    """Set up the cache of built quizzes for the Flask app. This is called by the application factory.
+
+    `QUIZ_CACHE_BACKEND` is a name of one of the `BACKENDS` or a callable that creates a cache object
+    for the app. A cache object should provide `get`, `set`, `delete`, `clear` and `stats` methods.
+    """
+    backend = app.config["QUIZ_CACHE_BACKEND"]
+    factory = backend if callable(backend) else BACKENDS[backend]
+    app.extensions["quiz_cache"] = factory(app)
@@ -1,33 +1,378 @@
+import heapq
+import json
+import logging
+import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 
 import click
-from flask import current_app, g
+from flask import current_app, g, request
 from flask.cli import with_appcontext
 
+logger = logging.getLogger("quizzer.sql")
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,
+    "mmap_size": 64 * 1024 * 1024,
+    "busy_timeout": 5000,
+    # Deleting a quiz keeps results of it's sessions in `quiz_result`, which would violate the constraints.
+    "foreign_keys": "OFF",
+}
+
+
+class QueryStats:
+    """Statistics of SQL statements executed through a connection."""
+
+    def __init__(self, slow_query_ms=None, slowest=5):
+        """Class initialization.
+
+        :param slow_query_ms: statements that take longer are logged as slow, None to disable the log.
+        :param slowest: number of the slowest statements to keep.
+        """
+        self.slow_query_ms = slow_query_ms
+        self.count = 0
+        self.total_time = 0.0
+        self._slowest_size = slowest
+        self._slowest = []
+
+    @property
+    def slowest(self):
+        """List of (duration in seconds, SQL statement) of the slowest statements, the slowest first."""
+        return sorted(self._slowest, reverse=True)
+
+    def record(self, sql, duration):
+        """Record an executed statement.
+
+        :param sql: SQL statement.
+        :param duration: time of the execution in seconds.
+        """
+        self.count += 1
+        self.total_time += duration
+        entry = (duration, sql)
+        if len(self._slowest) < self._slowest_size:
+            heapq.heappush(self._slowest, entry)
+        elif entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+        if self.slow_query_ms is not None and duration * 1000 >= self.slow_query_ms:
+            logger.warning(json.dumps({"event": "slow_query", "duration_ms": round(duration * 1000, 3),
+                                       "sql": " ".join(sql.split())}))
+
+    def as_dict(self):
+        """Get statistics as a dictionary for logging."""
+        return {
+            "queries": self.count,
+            "db_time_ms": round(self.total_time * 1000, 3),
+            "slowest": [{"duration_ms": round(duration * 1000, 3), "sql": " ".join(sql.split())}
+                        for duration, sql in self.slowest],
+        }
+
+
+class PooledConnection:
+    """Connection borrowed from the pool for a single request.
+
+    Behaves like `sqlite3.Connection`. Closing it returns the underlying connection back to the pool,
+    after that any further use raises `sqlite3.ProgrammingError` as a closed connection would.
+    Statements executed through the connection are timed and recorded to it's `stats`.
+    """
+
+    def __init__(self, pool, connection, stats=None):
+        """Class initialization.
+
+        :param pool: ConnectionPool object which the connection belongs to.
+        :param connection: sqlite3.Connection object.
+        :param stats: QueryStats object to record statements to.
+        """
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_connection", connection)
+        object.__setattr__(self, "stats", stats or QueryStats())
+
+    def _timed(self, sql, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.stats.record(sql, time.perf_counter() - started)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sql, self.connection.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(sql, self.connection.executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._timed(sql_script, self.connection.executescript, sql_script)
+
+    def commit(self):
+        return self._timed("COMMIT", self.connection.commit)
+
+    def rollback(self):
+        return self._timed("ROLLBACK", self.connection.rollback)
+
+    @property
+    def connection(self):
+        """Underlying sqlite3.Connection object."""
+        if self._connection is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return self._connection
+
+    def __getattr__(self, attr):
+        return getattr(self.connection, attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.connection, attr, value)
+
+    def __enter__(self):
+        return self.connection.__enter__()
+
+    def __exit__(self, *args):
+        return self.connection.__exit__(*args)
+
+    def close(self):
+        """Return the connection back to the pool."""
+        if self._connection is not None:
+            self._pool.release(self._connection)
+            object.__setattr__(self, "_connection", None)
+
+
+class ConnectionPool:
+    """Pool of connections to the database that are reused across requests of the process."""
+
+    def __init__(self, database, size, pragmas):
+        """Class initialization.
+
+        :param database: path to the database.
+        :param size: maximum number of idle connections to keep, 0 disables pooling.
+        :param pragmas: dictionary of PRAGMAs to set up for every new connection.
+        """
+        self.database = database
+        self.size = size
+        self.pragmas = pragmas
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Open a new connection to the database.
+
+        :return: sqlite3.Connection object.
+        """
+        connection = sqlite3.connect(self.database, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+
+    def acquire(self, stats=None):
+        """Take an idle connection from the pool or open a new one.
+
+        :param stats: QueryStats object to record statements of the connection to.
+        :return: PooledConnection object.
+        """
+        self._check_process()
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self.connect()
+        connection.row_factory = sqlite3.Row
+        return PooledConnection(self, connection, stats=stats)
+
+    def release(self, connection):
+        """Reset the connection and keep it in the pool, or close it if the pool is full.
+
+        :param connection: sqlite3.Connection object.
+        """
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+            connection.set_trace_callback(None)
+        except sqlite3.Error:
+            connection.close()
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and self._idle.qsize() < self.size:
+                self._idle.put_nowait(connection)
+                return
+        connection.close()
+
+    def close(self):
+        """Close all idle connections of the pool."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _check_process(self):
+        """Drop connections inherited from the parent process, they can't be shared after fork."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = queue.LifoQueue()
+                self._pid = os.getpid()
+
+
+def get_pool(app=None):
+    """Get the connection pool of the application, creating it on the first use.
+
+    :param app: Flask app, the current one if not given.
+    :return: ConnectionPool object.
+    """
+    app = app or current_app
+    pool = app.extensions.get("db_pool")
+    if pool is None:
+        pool = app.extensions.setdefault("db_pool", ConnectionPool(
+            database=app.config["DATABASE"],
+            size=app.config["DATABASE_POOL_SIZE"],
+            pragmas={**DEFAULT_PRAGMAS, **app.config["DATABASE_PRAGMAS"]},
+        ))
+    return pool
+
+
+def dispose_pool(app=None):
+    """Close idle connections of the application's pool, e.g. before the database file is removed.
+
+    :param app: Flask app, the current one if not given.
+    """
+    pool = (app or current_app).extensions.pop("db_pool", None)
+    if pool is not None:
+        pool.close()
+
 
 def get_db():
     """Connect to the application's configured database.
     The connection is unique for each request and will be reused if this is called again.
+    Connections are borrowed from the pool of the process and returned back at the end of the request.
     """
     if "db" not in g:
-        g.db = sqlite3.connect(current_app.config["DATABASE"], detect_types=sqlite3.PARSE_DECLTYPES)
-        g.db.row_factory = sqlite3.Row
+        g.db = get_pool().acquire(stats=QueryStats(slow_query_ms=current_app.config["SQL_SLOW_QUERY_MS"]))
 
     return g.db
 
 
+def log_query_stats(response):
+    """Log statistics of SQL statements of the request and add them to the response headers if it's enabled."""
+    db = g.get("db")
+    if db is None:
+        return response
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"event": "request", "method": request.method, "path": request.path,
+                                "endpoint": request.endpoint, "status": response.status_code,
+                                **db.stats.as_dict()}))
+    if current_app.config["SQL_DEBUG_HEADER"]:
+        response.headers["X-SQL-Queries"] = str(db.stats.count)
+        response.headers.add("Server-Timing",
+                             f'db;dur={db.stats.total_time * 1000:.3f};desc="{db.stats.count} queries"')
+    return response
+
+
 def close_db(e=None):
-    """If this request connected to the database, close the connection."""
+    """If this request connected to the database, return the connection to the pool."""
     db = g.pop("db", None)
 
     if db is not None:
         db.close()
 
 
+@contextmanager
+def transaction():
+    """Run a block of statements in a single write transaction.
+
+    The transaction is committed when the block succeeds and rolled back on any error.
+    If a transaction is already open on the connection, the block joins it and the outer code is responsible
+    for committing it.
+    """
+    db = get_db()
+    if db.in_transaction:
+        yield db
+        return
+
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        yield db
+    except BaseException:
+        db.rollback()
+        raise
+    db.commit()
+
+
+def next_id(table):
+    """Get the first free AUTOINCREMENT identifier of the table.
+
+    Should be called inside of a write transaction, so identifiers can't be taken by another connection.
+
+    :param table: name of the table.
+    :return: identifier that the next inserted row would get.
+    """
+    row = get_db().execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    return (row["seq"] if row else 0) + 1
+
+
 def init_db():
     """Clear existing data and create new tables."""
     with current_app.open_resource("schema.sql") as f:
         get_db().executescript(f.read().decode("utf8"))
+    migrate_db()
+
+
+def get_migrations():
+    """Get available migrations of the database schema.
+
+    Migrations are SQL scripts in the `migrations` folder named as `<version>_<description>.sql`.
+
+    :return: list of (version, file name) tuples sorted by version.
+    """
+    migrations = []
+    for file_name in os.listdir(os.path.join(current_app.root_path, "migrations")):
+        version, _, _ = file_name.partition("_")
+        if file_name.endswith(".sql") and version.isdigit():
+            migrations.append((int(version), file_name))
+    return sorted(migrations)
+
+
+def get_db_version():
+    """Get version of the database schema, i.e. the version of the last applied migration."""
+    return get_db().execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate_db():
+    """Apply migrations that are newer than the version of the database schema.
+
+    Every migration runs in it's own transaction along with the update of the schema version,
+    so a failed migration leaves the database at the previous version.
+
+    :return: list of file names of applied migrations.
+    """
+    db = get_db()
+    current_version = get_db_version()
+    applied = []
+    for version, file_name in get_migrations():
+        if version <= current_version:
+            continue
+        with current_app.open_resource(os.path.join("migrations", file_name)) as f:
+            script = f.read().decode("utf8")
+        try:
+            db.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;")
+        except sqlite3.Error:
+            if db.in_transaction:
+                db.rollback()
+            raise
+        applied.append(file_name)
+    return applied
+
+
+def explain_query_plan(sql, params=()):
+    """Get the query plan of SQL statement, e.g. to check that the statement uses indexes.
+
+    :param sql: SQL statement.
+    :param params: parameters of the statement.
+    :return: list of details of the query plan steps.
+    """
+    return [row["detail"] for row in get_db().execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
 
 
 @click.command("init-db")
@@ -38,7 +383,29 @@ def init_db_command():
     click.echo("Initialized the database.")
 
 
+@click.command("migrate-db")
+@with_appcontext
+def migrate_db_command():
+    """Apply new migrations to the database without losing data."""
+    applied = migrate_db()
+    for file_name in applied:
+        click.echo(f"Applied {file_name}.")
+    click.echo(f"Database is up to date (version {get_db_version()}).")
+
+
+@click.command("explain-query")
+@click.argument("sql")
+@with_appcontext
+def explain_query_command(sql):
+    """Show the query plan of SQL statement."""
+    for detail in explain_query_plan(sql):
+        click.echo(detail)
+
+
 def init_app(app):
     """Register database functions with the Flask app. This is called by the application factory."""
+    app.after_request(log_query_stats)
     app.teardown_appcontext(close_db)
     app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_db_command)
+    app.cli.add_command(explain_query_command)
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+
+from quizzer.db import get_db
+from quizzer.quizzes import QuizResult
+
+RESULT_FIELDS = ("id", "user_id", "user_name", "author_id", "author_name", "quiz_id", "quiz_name",
+                 "quiz_session_id", "correct_answers", "total_answers", "created")
+CHUNK_SIZE = 64 * 1024
+
+
+def row_to_dict(row, fields):
+    """Convert a database row to a dictionary with given fields.
+
+    :param row: database row.
+    :param fields: names of columns.
+    :return: dictionary.
+    """
+    return {field: row[field].isoformat(sep=" ") if isinstance(row[field], datetime) else row[field]
+            for field in fields}
+
+
+def _chunked(lines):
+    """Join lines into chunks of about CHUNK_SIZE, so a large export isn't sent by tiny writes."""
+    chunk, size = [], 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk)
+
+
+def generate_ndjson(rows, fields):
+    """Generate newline-delimited JSON of the rows, one row per line.
+
+    :param rows: iterable of database rows.
+    :param fields: names of columns to export.
+    :return: generator of chunks of text.
+    """
+    return _chunked(json.dumps(row_to_dict(row, fields), ensure_ascii=False) + "\n" for row in rows)
+
+
+def generate_csv(rows, fields):
+    """Generate CSV of the rows with a header.
+
+    :param rows: iterable of database rows.
+    :param fields: names of columns to export.
+    :return: generator of chunks of text.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(values)
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return value
+
+    def lines():
+        yield line(fields)
+        for row in rows:
+            yield line(row_to_dict(row, fields).values())
+
+    return _chunked(lines())
+
+
+FORMATS = {
+    "csv": ("text/csv", generate_csv),
+    "ndjson": ("application/x-ndjson", generate_ndjson),
+}
+
+
+def parse_time(value, end=False):
+    """Parse date or date with time to a timestamp comparable to the `created` columns.
+
+    :param value: date as `YYYY-MM-DD` or date with time in ISO format.
+    :param end: value is the end of a range, so a date without time means the end of that day.
+    :return: timestamp as `YYYY-MM-DD HH:MM:SS` string.
+    :raise ValueError: if the value is not a valid date.
+    """
+    time = datetime.fromisoformat(value)
+    if end and len(value) == len("YYYY-MM-DD"):
+        time += timedelta(days=1)
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+@click.command("export-results")
+@click.option("--format", "export_format", type=click.Choice(list(FORMATS)), default="csv", show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False, writable=True, allow_dash=True), default="-",
+              help="File to write the export to, standard output by default.")
+@click.option("--author", help="Username of the author of quizzes.")
+@click.option("--student", help="Username of the student.")
+@click.option("--quiz", "quiz_id", type=int, help="Quiz ID.")
+@click.option("--since", help="Export sessions submitted on this date (YYYY-MM-DD) or time or later.")
+@click.option("--until", help="Export sessions submitted until this date (YYYY-MM-DD, inclusive) or time.")
+@click.option("--fields", help="Comma-separated list of fields to export, all fields by default.")
+@with_appcontext
+def export_results_command(export_format, output, author, student, quiz_id, since, until, fields):
+    """Export scores of quiz sessions in CSV or newline-delimited JSON."""
+    fields = tuple(fields.split(",")) if fields else RESULT_FIELDS
+    unknown = [field for field in fields if field not in RESULT_FIELDS]
+    if unknown:
+        raise click.BadParameter(f"Unknown fields: {', '.join(unknown)}", param_hint="--fields")
+
+    def user_id(username, option):
+        if username is None:
+            return None
+        user = get_db().execute("SELECT id FROM user WHERE username = ?", (username,)).fetchone()
+        if user is None:
+            raise click.BadParameter(f"User {username} does not exist", param_hint=option)
+        return user["id"]
+
+    try:
+        since, until = since and parse_time(since), until and parse_time(until, end=True)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--since/--until")
+    rows = QuizResult.iter_session_results(author_id=user_id(author, "--author"), user_id=user_id(student, "--student"),
+                                           quiz_id=quiz_id, since=since, until=until)
+    _, generate = FORMATS[export_format]
+    with click.open_file(output, "w", encoding="utf8") as f:
+        for chunk in generate(rows, fields):
+            f.write(chunk)
+
+
+def init_app(app):
+    """Register export commands with the Flask app. This is called by the application factory."""
+    app.cli.add_command(export_results_command)
@@ -0,0 +1,26 @@
+from flask import Blueprint, jsonify
+
+from quizzer.db import get_db, get_db_version, get_migrations
+
+bp = Blueprint("health", __name__)
+
+
+@bp.route("/healthz")
+def liveness():
+    """Liveness probe: the process serves requests. Doesn't touch the database, so a slow database
+    doesn't get workers restarted.
+    """
+    return jsonify(status="ok")
+
+
+@bp.route("/readyz")
+def readiness():
+    """Readiness probe: the database is reachable and it's schema is up to date."""
+    try:
+        get_db().execute("SELECT 1").fetchone()
+        version, latest_version = get_db_version(), get_migrations()[-1][0]
+    except Exception as e:
+        return jsonify(status="unavailable", error=str(e)), 503
+    if version < latest_version:
+        return jsonify(status="unavailable", error=f"Database version {version} is older than {latest_version}"), 503
+    return jsonify(status="ok", database_version=version)
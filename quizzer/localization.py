@@ -1,20 +1,35 @@
+import hashlib
+import json
+
+from flask import Response, abort, g, has_request_context, request
+
+DEFAULT_LANGUAGE = "en"
+
+
 class Localization:
-    _current_lang = None
+    """Messages in the language of the current request."""
 
     @property
     def current_lang(self):
-        if self._current_lang is None:
-            from flask import request
-            best_lang = request.accept_languages.best_match(['ru', 'en'])
-            self._current_lang = best_lang if best_lang in _localization else 'en'
-        return self._current_lang
+        """Language that best matches `Accept-Language` of the current request, resolved once per request."""
+        if not has_request_context():
+            return DEFAULT_LANGUAGE
+        if "lang" not in g:
+            best_lang = request.accept_languages.best_match(list(_localization))
+            g.lang = best_lang if best_lang in _localization else DEFAULT_LANGUAGE
+        return g.lang
+
+    @property
+    def etag(self):
+        """Version of the messages catalog of the current language."""
+        return _catalogs[self.current_lang][1]
 
     def __getattr__(self, attr):
         return _localization[self.current_lang][attr]
 
     def dict(self):
-        import json
-        return json.dumps(_localization[self.current_lang])
+        """Get messages of the current language as JSON."""
+        return _catalogs[self.current_lang][0]
 
 
 locale = Localization()
@@ -42,7 +57,9 @@ _localization = {
         "answer_option": "Ответ №",
         "add_question": "Добавить вопрос",
         "search": "Поиск...",
+        "next_page": "Далее",
         "history": "История",
+        "export_csv": "Экспорт в CSV",
         "name": "Название",
         "quiz_name": "Название Опроса",
         "author_name": "Автор",
@@ -61,6 +78,7 @@ _localization = {
         "error_question_too_many_answers": "Вопрос не может иметь несколько вариантов ответов",
         "error_question_no_answers": "Вопрос должен иметь выбранный ответ",
         "error_no_answer_text": "Ответ не может быть пустым",
+        "error_too_many_attempts": "Слишком много попыток, попробуйте позже",
         "error_wrong_data": "Получен неверный формат данных, должен быть словарь вопросов",
         "error_no_username": "Имя не может быть пустым",
         "error_no_password": "Пароль не может быть пустым",
@@ -69,7 +87,9 @@ _localization = {
         "error_incorrect_password": "Неверный пароль",
         "error_no_answer_id": "Вариант ответа с id={answer_id} не существует",
         "error_no_question_id": "Вопроса с id={question_id} не существует",
-        "error_no_quiz_id": "Опроса с id={quiz_id} не существует"
+        "error_no_quiz_id": "Опроса с id={quiz_id} не существует",
+        "error_quiz_changed": "Опрос был изменён, обновите страницу и попробуйте снова",
+        "error_session_not_in_progress": "Опрос уже отправлен или не был начат"
     },
     "en": {
         "username": "Username",
@@ -93,7 +113,9 @@ _localization = {
         "answer_option": "Answer option #",
         "add_question": "Add question",
         "search": "Search....",
+        "next_page": "Next page",
         "history": "History",
+        "export_csv": "Export to CSV",
         "name": "Name",
         "quiz_name": "Quiz Name",
         "author_name": "Author Name",
@@ -112,6 +134,7 @@ _localization = {
         "error_question_too_many_answers": "Question shouldn't contain more than one answer",
         "error_question_no_answers": "Question should contain at least one answer",
         "error_no_answer_text": "Answer text is required",
+        "error_too_many_attempts": "Too many attempts, try again later",
         "error_wrong_data": "Got wrong data, should be dict of questions",
         "error_no_username": "Username is required",
         "error_no_password": "Password is required",
@@ -120,6 +143,38 @@ _localization = {
         "error_incorrect_password": "Incorrect password",
         "error_no_answer_id": "Answer with id={answer_id} does not exist",
         "error_no_question_id": "Question with id={question_id} does not exist",
-        "error_no_quiz_id": "Quiz with id={quiz_id} does not exist"
+        "error_no_quiz_id": "Quiz with id={quiz_id} does not exist",
+        "error_quiz_changed": "Quiz was changed meanwhile, reload the page and try again",
+        "error_session_not_in_progress": "Quiz was already submitted or wasn't started"
     }
 }
+
+
+def _compile(messages):
+    catalog = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+    return catalog, hashlib.sha1(catalog.encode("utf8")).hexdigest()[:16]
+
+
+# JSON catalogs of messages and their ETags are built once, templates and scripts only reuse them.
+_catalogs = {lang: _compile(messages) for lang, messages in _localization.items()}
+
+
+def locale_script(lang):
+    """Serves messages of the language as a script that defines `locale` variable for `quiz.manager.js`.
+
+    The script is cached by browsers and revalidated by ETag of the catalog.
+    """
+    if lang not in _catalogs:
+        abort(404)
+    catalog, etag = _catalogs[lang]
+    response = Response(f"var locale = {catalog};\n", mimetype="application/javascript")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 365 * 24 * 60 * 60 if request.args.get("v") == etag else 60 * 60
+    return response.make_conditional(request)
+
+
+def init_app(app):
+    """Register localization with the Flask app. This is called by the application factory."""
+    app.jinja_env.globals["get_locale"] = locale
+    app.add_url_rule("/locale/<lang>.js", endpoint="locale_script", view_func=locale_script)
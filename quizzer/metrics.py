@@ -0,0 +1,408 @@
+import contextlib
+import glob
+import hmac
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+from flask import Response, abort, current_app, g, request
+
+try:
+    import fcntl
+except ImportError:  # snapshots of several processes are only used by gunicorn, which doesn't run on Windows
+    fcntl = None
+
+from quizzer.cache import get_quiz_cache
+from quizzer.db import get_db
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Totals of counters and histograms of exited processes
+ARCHIVE_FILE = "archive.json"
+
+
+def _snapshot_path(directory, pid):
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def _snapshot_pid(path):
+    try:
+        return int(os.path.basename(path)[len("metrics-"):-len(".json")])
+    except ValueError:
+        return None
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextlib.contextmanager
+def _locked(directory):
+    """Hold a lock of the directory, so snapshots are not read while they are moved to the archive."""
+    with open(os.path.join(directory, "metrics.lock"), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _write_json(directory, path, data):
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def archive_snapshot(directory, pid):
+    """Move counters and histograms of an exited process to the archive, which is reported along with live processes,
+    so the totals don't go down when a worker exits. Gauges of the process are dropped.
+
+    The snapshot of the process is removed, so a new process with the same PID doesn't take it over.
+
+    :param directory: directory with snapshots of processes.
+    :param pid: PID of the exited process.
+    """
+    with _locked(directory):
+        _archive(directory, _snapshot_path(directory, pid))
+
+
+def _archive(directory, path):
+    snapshot = _read_json(path)
+    if snapshot is not None:
+        totals = {name: metric for name, metric in snapshot.items() if metric["type"] != "gauge"}
+        archive = _read_json(os.path.join(directory, ARCHIVE_FILE)) or {}
+        _write_json(directory, os.path.join(directory, ARCHIVE_FILE), merge([archive, totals]))
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def archive_stale_snapshots(directory):
+    """Archive snapshots of processes that don't exist anymore, e.g. of workers killed before they could clean up.
+
+    :param directory: directory with snapshots of processes.
+    """
+    with _locked(directory):
+        for path in glob.glob(_snapshot_path(directory, "*")):
+            pid = _snapshot_pid(path)
+            if pid is None or not _is_alive(pid):
+                _archive(directory, path)
+
+
+class Metric:
+    """Base class of metrics. Values are kept for every combination of label values."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        """Class initialization.
+
+        :param name: name of the metric.
+        :param documentation: help text of the metric.
+        :param labelnames: names of labels of the metric.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        """Get values of the metric as a JSON serializable dictionary."""
+        with self._lock:
+            samples = json.loads(json.dumps([[list(key), value] for key, value in self._values.items()]))
+        return {"type": self.kind, "help": self.documentation, "labelnames": list(self.labelnames),
+                "samples": samples}
+
+
+class Counter(Metric):
+    """Metric with value that only goes up."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        """Set the total, for counters that are maintained elsewhere, e.g. by a cache."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Gauge(Metric):
+    """Metric with value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """Metric that counts observed values in buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = next((index for index, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def snapshot(self):
+        result = super().snapshot()
+        result["buckets"] = list(self.buckets)
+        return result
+
+
+class Registry:
+    """Registry of metrics of the process.
+
+    If a directory is given, the registry periodically writes a snapshot of it's metrics there,
+    so metrics of all worker processes can be merged on scrape.
+    """
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        """Class initialization.
+
+        :param directory: path to the directory for snapshots of worker processes, None for a single process.
+        :param flush_interval: minimal interval between writes of snapshots in seconds.
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.collectors = []
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._flushed = 0.0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _get(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Get a counter, registering it on the first use."""
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Get a gauge, registering it on the first use."""
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Get a histogram, registering it on the first use."""
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def snapshot(self):
+        """Run collectors and get values of all metrics as a JSON serializable dictionary."""
+        for collector in self.collectors:
+            collector(self)
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def flush(self, force=False):
+        """Write the snapshot of the process to the directory, at most once per flush interval.
+
+        :param force: write the snapshot regardless of the interval.
+        """
+        now = time.monotonic()
+        if not self.directory or (not force and now - self._flushed < self.flush_interval):
+            return
+        self._flushed = now
+        _write_json(self.directory, _snapshot_path(self.directory, os.getpid()), self.snapshot())
+
+    def retire(self):
+        """Write the last values of the exiting process and move them to the archive, see `archive_snapshot`."""
+        if not self.directory:
+            return
+        self.flush(force=True)
+        archive_snapshot(self.directory, os.getpid())
+
+    def collect(self):
+        """Get values of all metrics, merged across live processes and the archive of exited ones
+        if the registry has a directory.
+        """
+        if not self.directory:
+            return self.snapshot()
+        self.flush(force=True)
+        archive_stale_snapshots(self.directory)
+        with _locked(self.directory):
+            paths = glob.glob(_snapshot_path(self.directory, "*")) + [os.path.join(self.directory, ARCHIVE_FILE)]
+            snapshots = [_read_json(path) for path in paths]
+        return merge([snapshot for snapshot in snapshots if snapshot is not None])
+
+
+def merge(snapshots):
+    """Merge snapshots of processes by summing up values of the same metrics and labels.
+
+    :param snapshots: list of snapshots of registries.
+    :return: merged snapshot.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "samples": []})
+            samples = {tuple(labels): value for labels, value in target["samples"]}
+            for labels, value in metric["samples"]:
+                labels = tuple(labels)
+                if labels not in samples:
+                    samples[labels] = value
+                elif metric["type"] == "histogram":
+                    counts, total = samples[labels]
+                    samples[labels] = [[a + b for a, b in zip(counts, value[0])], total + value[1]]
+                else:
+                    samples[labels] += value
+            target["samples"] = [[list(labels), value] for labels, value in samples.items()]
+    return merged
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = [(name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+               for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def render(snapshot):
+    """Render a snapshot in the Prometheus text exposition format.
+
+    :param snapshot: snapshot of a registry.
+    :return: text of the exposition.
+    """
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric["samples"]):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(metric['labelnames'], labels)} {_number(value)}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(metric["buckets"] + [math.inf], counts):
+                cumulative += count
+                le = (("le", _number(bound)),)
+                lines.append(f"{name}_bucket{_labels(metric['labelnames'], labels, le)} {_number(cumulative)}")
+            lines.append(f"{name}_sum{_labels(metric['labelnames'], labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(metric['labelnames'], labels)} {_number(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def get_metrics():
+    """Get the registry of metrics of the current application."""
+    return current_app.extensions["metrics"]
+
+
+def start_timer():
+    """Remember the start time of the request."""
+    g.request_started = time.perf_counter()
+
+
+def record_request(response):
+    """Record latency, status and database time of the request."""
+    started = g.pop("request_started", None)
+    if started is None or request.endpoint == "metrics":
+        return response
+
+    registry = get_metrics()
+    endpoint = request.endpoint or "unknown"
+    registry.counter("quizzer_requests_total", "Requests by endpoint, method and status.",
+                     ("endpoint", "method", "status")).inc(endpoint=endpoint, method=request.method,
+                                                           status=response.status_code)
+    registry.histogram("quizzer_request_duration_seconds", "Latency of requests by endpoint.",
+                       ("endpoint",)).observe(time.perf_counter() - started, endpoint=endpoint)
+    db = g.get("db")
+    if db is not None:
+        registry.histogram("quizzer_request_db_seconds", "Time spent in the database by requests by endpoint.",
+                           ("endpoint",)).observe(db.stats.total_time, endpoint=endpoint)
+        registry.counter("quizzer_db_queries_total", "SQL statements executed by requests by endpoint.",
+                         ("endpoint",)).inc(db.stats.count, endpoint=endpoint)
+    registry.flush()
+    return response
+
+
+def collect_cache_stats(registry):
+    """Copy statistics of the quiz cache of the process to the registry."""
+    stats = get_quiz_cache().stats()
+    registry.counter("quizzer_quiz_cache_hits_total", "Hits of the quiz cache.").set(stats["hits"])
+    registry.counter("quizzer_quiz_cache_misses_total", "Misses of the quiz cache.").set(stats["misses"])
+    registry.gauge("quizzer_quiz_cache_entries", "Entries in the quiz cache.").set(stats["size"])
+
+
+def active_sessions_snapshot():
+    """Get the number of quiz sessions in progress, which is shared by all processes, from the database."""
+    gauge = Gauge("quizzer_active_quiz_sessions", "Quiz sessions that were started recently and not submitted yet.")
+    gauge.set(get_db().execute(
+        "SELECT COUNT(*) FROM quiz_session WHERE status = 'in_progress' AND started >= datetime('now', ?)",
+        (f"-{current_app.config['QUIZ_SESSION_TIMEOUT']} seconds",),
+    ).fetchone()[0])
+    return {gauge.name: gauge.snapshot()}
+
+
+def metrics():
+    """Expose metrics of the application in the Prometheus text exposition format.
+    If METRICS_TOKEN is set, the scraper has to send it as a bearer token.
+    """
+    token = current_app.config["METRICS_TOKEN"]
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        abort(403)
+    snapshot = {**get_metrics().collect(), **active_sessions_snapshot()}
+    return Response(render(snapshot), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    """Register metrics collection with the Flask app. This is called by the application factory.
+
+    The registry is always available to the application code, but requests are measured and exposed
+    on `/metrics` only if METRICS_ENABLED is set.
+    """
+    enabled = app.config["METRICS_ENABLED"]
+    registry = Registry(directory=app.config["METRICS_DIR"] if enabled else None,
+                        flush_interval=app.config["METRICS_FLUSH_INTERVAL"])
+    registry.collectors.append(collect_cache_stats)
+    app.extensions["metrics"] = registry
+    if not enabled:
+        return
+    app.before_request(start_timer)
+    app.after_request(record_request)
+    app.add_url_rule("/metrics", endpoint="metrics", view_func=metrics)
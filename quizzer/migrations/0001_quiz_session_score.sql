@@ -0,0 +1,23 @@
+-- Store scores of quiz sessions and fill them in from already submitted results.
+
+CREATE TABLE IF NOT EXISTS quiz_session_score (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL,
+  quiz_session_id INTEGER NOT NULL,
+  quiz_id INTEGER NOT NULL,
+  correct_answers INTEGER NOT NULL,
+  total_answers INTEGER NOT NULL,
+  created TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE (user_id, quiz_session_id),
+  FOREIGN KEY (user_id) REFERENCES user (id),
+  FOREIGN KEY (quiz_id) REFERENCES quizzes (id)
+);
+
+INSERT OR IGNORE INTO quiz_session_score (user_id, quiz_session_id, quiz_id, correct_answers, total_answers)
+    SELECT qr.user_id, qr.quiz_session_id, qr.quiz_id, SUM(qr.answer_id = que.answer_id),
+        (SELECT COUNT(*) FROM quiz_question_rel WHERE quiz_id = qr.quiz_id)
+    FROM quiz_result qr
+    JOIN quiz_question_rel qqr ON qqr.quiz_id = qr.quiz_id AND qqr.question_id = qr.question_id
+    JOIN questions que ON que.id = qr.question_id
+    GROUP BY qr.user_id, qr.quiz_session_id
+    ORDER BY MIN(qr.id);
@@ -0,0 +1,9 @@
+-- Add indexes for lookups of the hot queries.
+
+CREATE INDEX IF NOT EXISTS quiz_result_user_session_idx ON quiz_result (user_id, quiz_session_id);
+CREATE INDEX IF NOT EXISTS quiz_result_quiz_idx ON quiz_result (quiz_id);
+CREATE INDEX IF NOT EXISTS quiz_question_rel_quiz_idx ON quiz_question_rel (quiz_id, question_id);
+CREATE INDEX IF NOT EXISTS question_answer_rel_question_idx ON question_answer_rel (question_id);
+CREATE INDEX IF NOT EXISTS question_answer_rel_answer_idx ON question_answer_rel (answer_option_id);
+CREATE INDEX IF NOT EXISTS quizzes_author_idx ON quizzes (author_id);
+CREATE INDEX IF NOT EXISTS quiz_session_score_quiz_idx ON quiz_session_score (quiz_id);
@@ -0,0 +1,3 @@
+-- Stamp quizzes with a version that is increased on every change, e.g. to invalidate cached quizzes.
+
+ALTER TABLE quizzes ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
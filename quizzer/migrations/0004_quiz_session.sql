@@ -0,0 +1,17 @@
+-- Allocate quiz sessions from a dedicated table and track their state.
+
+CREATE TABLE quiz_session (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id INTEGER NOT NULL,
+  quiz_id INTEGER,
+  status TEXT NOT NULL DEFAULT 'in_progress',
+  started TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  finished TIMESTAMP,
+  FOREIGN KEY (user_id) REFERENCES user (id),
+  FOREIGN KEY (quiz_id) REFERENCES quizzes (id)
+);
+
+CREATE INDEX quiz_session_in_progress_idx ON quiz_session (quiz_id) WHERE status = 'in_progress';
+
+-- Continue numbering after sessions that already have results, so new sessions never reuse their IDs.
+INSERT INTO sqlite_sequence (name, seq) SELECT 'quiz_session', IFNULL(MAX(quiz_session_id), 0) FROM quiz_result;
@@ -0,0 +1,3 @@
+-- Exports of results filter quiz sessions by the time they were submitted.
+
+CREATE INDEX IF NOT EXISTS quiz_session_score_created_idx ON quiz_session_score (created);
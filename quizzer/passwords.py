@@ -0,0 +1,89 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+def normalize_method(method):
+    """Fill in the defaults of werkzeug, which are stored in the hash even when the method omits them.
+
+    :param method: hashing method in the format of werkzeug, e.g. `pbkdf2:sha256`.
+    :return: method with the hash name and the number of iterations, e.g. `pbkdf2:sha256:260000`.
+    """
+    if not method.startswith("pbkdf2"):
+        return method
+    args = method[len("pbkdf2"):].lstrip(":").split(":")
+    hash_name = args[0] or "sha256"
+    iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+    return f"pbkdf2:{hash_name}:{iterations}"
+
+
+class PasswordHasher:
+    """Hashes and checks passwords on a bounded pool of threads.
+
+    Hashing takes tens of milliseconds of CPU, the pool limits how many hashes are computed at the same time,
+    so a burst of logins doesn't take CPU from other requests. `hashlib` releases GIL while hashing.
+    """
+
+    def __init__(self, method, salt_length=16, max_workers=None):
+        """Class initialization.
+
+        :param method: hashing method in the format of werkzeug, e.g. `pbkdf2:sha256:150000`.
+        :param salt_length: length of the salt.
+        :param max_workers: maximum number of passwords hashed at the same time, number of CPUs by default.
+        """
+        self.method = method
+        self.salt_length = salt_length
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            # Threads of the executor don't exist in a forked process
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="quizzer-hash")
+                self._pid = os.getpid()
+        return self._executor.submit(fn, *args).result()
+
+    def hash(self, password):
+        """Hash the password with the configured method.
+
+        :param password: password.
+        :return: hash of the password.
+        """
+        return self._submit(generate_password_hash, password, self.method, self.salt_length)
+
+    def check(self, pwhash, password):
+        """Check the password against the hash.
+
+        :param pwhash: hash of the password.
+        :param password: password.
+        :return: True if the password matches.
+        """
+        return self._submit(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Check that the hash was made with other method or salt length than the configured ones.
+
+        :param pwhash: hash of the password.
+        :return: True if the password should be hashed again.
+        """
+        method, _, rest = pwhash.partition("$")
+        salt, _, _ = rest.partition("$")
+        return normalize_method(method) != normalize_method(self.method) or len(salt) != self.salt_length
+
+
+def get_password_hasher():
+    """Get the password hasher of the current application, creating it on the first use."""
+    hasher = current_app.extensions.get("password_hasher")
+    if hasher is None:
+        hasher = current_app.extensions.setdefault("password_hasher", PasswordHasher(
+            method=current_app.config["PASSWORD_HASH_METHOD"],
+            salt_length=current_app.config["PASSWORD_SALT_LENGTH"],
+            max_workers=current_app.config["PASSWORD_HASH_WORKERS"],
+        ))
+    return hasher
@@ -1,19 +1,109 @@
-from flask import Blueprint, flash, abort, g, redirect, render_template, request, url_for, jsonify, session
+import hashlib
+
+from flask import Blueprint, flash, abort, current_app, g, redirect, render_template, request, url_for, jsonify, \
+    session, make_response
 
 from quizzer.auth import login_required
-from quizzer.db import get_db
+from quizzer.cache import get_quiz_cache
+from quizzer.db import get_db, next_id, transaction
 from quizzer.localization import locale
+from quizzer.metrics import get_metrics
+from quizzer.writer import get_result_writer
 
 bp = Blueprint("quizzes", __name__)
 
 
+def page_args():
+    """Get pagination arguments of the current request.
+
+    :return: tuple of (text to search, cursor of the page, number of items on the page)
+    """
+    search = request.args.get("q", "").strip() or None
+    cursor = request.args.get("cursor", type=int)
+    return search, cursor, current_app.config["PAGE_SIZE"]
+
+
+def render_conditional(template_name, version, **context):
+    """Render the template, or respond with `304 Not Modified` if the client already has the same page.
+
+    The ETag of the page is built from the version of the data it shows, the user, the language
+    and the templates, so the page is only rendered when one of them changes.
+
+    :param template_name: name of the template.
+    :param version: hashable data which the page depends on, e.g. IDs and versions of shown quizzes.
+    :param context: variables for the template.
+    :return: response.
+    """
+    if session.get("_flashes"):
+        return render_template(template_name, **context)
+
+    user_id = g.user['id'] if g.user else None
+    etag = hashlib.md5(repr((current_app.extensions["templates_version"], locale.current_lang, user_id,
+                             template_name, version)).encode("utf8")).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(render_template(template_name, **context))
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.update(("Cookie", "Accept-Language"))
+    return response
+
+
+def paginate(rows, limit):
+    """Split rows selected with `limit + 1` into a page and a cursor of the next page.
+
+    :param rows: database query list with `id` column.
+    :param limit: number of items on the page.
+    :return: tuple of (rows of the page, cursor of the next page or None if it's the last page)
+    """
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]['id']
+    return rows, None
+
+
+def match_by_text(items, new_items):
+    """Pair items with new items that have the same text. Items are not paired by position, so rows of removed
+    items, which stored results may link to, are never reused for other content.
+
+    :param items: list of objects with `text` property.
+    :param new_items: list of new objects with `text` property.
+    :return: tuple of (list of (item, new item) pairs in order of new items, where item is None for new items
+        without a pair, list of items without a pair)
+    """
+    by_text = {}
+    for item in items:
+        by_text.setdefault(item.text, []).append(item)
+    paired = [by_text[new_item.text].pop(0) if by_text.get(new_item.text) else None for new_item in new_items]
+    paired_ids = {id(item) for item in paired if item is not None}
+    unpaired = [item for item in items if id(item) not in paired_ids]
+    return list(zip(paired, new_items)), unpaired
+
+
+def like_pattern(text):
+    """Build a LIKE pattern that matches given text anywhere in the value.
+
+    :param text: text to search.
+    :return: pattern to use with `ESCAPE '\\'`.
+    """
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
 @bp.route("/")
 def index():
     """Index route for quizzes. Shows available quizzes for students and created quizzes for authors."""
-    quizzes = []
+    quizzes, next_cursor = [], None
+    search, cursor, limit = page_args()
     if g.user is not None:
-        quizzes = Quiz.select_by_author_id(author_id=g.user['id']) if g.is_admin else Quiz.select_available_to_solve()
-    return render_template("quizzes/index.html", quizzes=quizzes)
+        if g.is_admin:
+            quizzes = Quiz.select_by_author_id(author_id=g.user['id'], search=search, cursor=cursor, limit=limit + 1)
+        else:
+            quizzes = Quiz.select_available_to_solve(search=search, cursor=cursor, limit=limit + 1)
+        quizzes, next_cursor = paginate(quizzes, limit)
+    return render_conditional("quizzes/index.html", (search, [tuple(quiz) for quiz in quizzes]),
+                              quizzes=quizzes, search=search, next_cursor=next_cursor)
 
 
 @bp.route("/create", methods=("GET", "POST"))
@@ -22,24 +112,14 @@ def create():
     """Creates new quiz and stores information about it in database."""
     if request.method == "GET":
         return render_template("quizzes/create.html")
-    error = None
-    questions = []
-    quiz_name = None
-    if isinstance(request.json, dict):
-        for quiz in request.json:
-            quiz_name = quiz
-            for question_text in request.json[quiz_name]:
-                question_options = request.json[quiz_name][question_text]
-                questions.append(Question(text=question_text, options=question_options))
-    else:
-        error = locale.error_wrong_data
-
-    new_quiz = Quiz(author_id=g.user["id"], name=quiz_name, questions=questions)
+    try:
+        new_quiz = Quiz.from_dict(author_id=g.user["id"], quiz_dict=request.json)
+    except ValueError as e:
+        return jsonify(error=str(e))
     errors = new_quiz.validate()
 
-    if error or errors:
-        error_msg = "\n".join(filter(None, [error, *errors]))
-        return jsonify(error=error_msg)
+    if errors:
+        return jsonify(error="\n".join(errors))
     else:
         db = get_db()
         new_quiz.add_to_db()
@@ -56,29 +136,19 @@ def edit(quiz_id):
         return render_template("quizzes/edit.html", quiz=quiz)
     original_quiz = Quiz.from_quiz_id(quiz_id)
     original_quiz.validate()
-    questions = []
-    quiz_name = None
-    error = None
-    if isinstance(request.json, dict):
-        for quiz in request.json:
-            quiz_name = quiz
-            for question_text in request.json[quiz_name]:
-                question_options = request.json[quiz_name][question_text]
-                questions.append(Question(text=question_text, options=question_options))
-    else:
-        error = locale.error_wrong_data
-
-    new_quiz = Quiz(author_id=g.user["id"], name=quiz_name, questions=questions)
+    try:
+        new_quiz = Quiz.from_dict(author_id=g.user["id"], quiz_dict=request.json)
+    except ValueError as e:
+        return jsonify(error=str(e))
     errors = new_quiz.validate()
 
-    if error or errors:
-        error_msg = "\n".join(filter(None, [error, *errors]))
-        return jsonify(error=error_msg)
+    if errors:
+        return jsonify(error="\n".join(errors))
     else:
-        db = get_db()
-        original_quiz.delete_from_db()
-        new_quiz.add_to_db()
-        db.commit()
+        try:
+            original_quiz.update_in_db(new_quiz)
+        except ValueError as e:
+            return jsonify(error=str(e))
         return jsonify(result="success", url=redirect(url_for("quizzes.index")).headers["Location"])
 
 
@@ -99,28 +169,31 @@ def solve(quiz_id):
     quiz = Quiz.from_quiz_id(quiz_id)
     if g.user['is_admin']:
         abort(403)
+    # Quiz sessions are kept by quiz, so quizzes solved in several tabs don't share a session
+    quiz_sessions = session.get('quiz_sessions', {})
     if request.method == "GET":
-        if not session.get('quiz_session_id'):
-            Quiz.create_session_for_user(g.user['id'])
-        return render_template("quizzes/solve.html", quiz=quiz)
-
-    errors = []
-    for question_id, answer_id in request.form.items():
-        errors.append(Question.validate_id(question_id))
-        errors.append(AnswerOption.validate_id(answer_id))
+        if str(quiz.quiz_id) not in quiz_sessions:
+            session_id = Quiz.create_session_for_user(g.user['id'], quiz_id=quiz.quiz_id)
+            session['quiz_sessions'] = {**quiz_sessions, str(quiz.quiz_id): session_id}
+        return render_conditional("quizzes/solve.html", (quiz.quiz_id, quiz.version), quiz=quiz)
 
-    errors = list(filter(None, errors))
+    answers = list(request.form.items())
+    errors = quiz.validate_answers(answers)
     if errors:
         flash("\n".join(errors))
         return render_template("quizzes/solve.html", quiz=quiz)
 
-    for question_id, answer_id in request.form.items():
-        quiz.write_answer_result(user_id=g.user['id'], question_id=question_id, answer_id=answer_id)
-
-    answers_ratio = QuizResult.calculate_answers(quiz_id=quiz.quiz_id, user_id=g.user['id'],
-                                                 session_id=session['quiz_session_id'])
-
-    session['quiz_session_id'] = None
+    try:
+        if str(quiz.quiz_id) not in quiz_sessions:
+            raise ValueError(locale.error_session_not_in_progress)
+        answers_ratio = quiz.write_answer_results(user_id=g.user['id'], answers=answers,
+                                                  session_id=quiz_sessions[str(quiz.quiz_id)])
+    except ValueError as e:
+        flash(str(e))
+        return render_template("quizzes/solve.html", quiz=quiz), 409
+    get_metrics().counter("quizzer_submissions_total", "Accepted quiz submissions.").inc()
+
+    session['quiz_sessions'] = {key: value for key, value in quiz_sessions.items() if key != str(quiz.quiz_id)}
     return render_template("quizzes/result.html", quiz=quiz, answers_ratio=answers_ratio)
 
 
@@ -128,32 +201,16 @@ def solve(quiz_id):
 @login_required
 def history():
     """Shows history for solved quizzes with information about students, authors, results, etc."""
+    search, cursor, limit = page_args()
     if g.is_admin:
-        quiz_results = QuizResult.get_quiz_results_for_author(author_id=g.user['id'])
+        quiz_info = QuizResult.get_session_results_for_author(author_id=g.user['id'], search=search, cursor=cursor,
+                                                              limit=limit + 1)
     else:
-        quiz_results = QuizResult.get_quiz_results_for_user(user_id=g.user['id'])
-    user_ids = {result['user_id'] for result in quiz_results}
-
-    quiz_info = []
-    for user_id in user_ids:
-        session_ids = {result['quiz_session_id'] for result in quiz_results}
-        for session_id in session_ids:
-            quiz_result = QuizResult.get_quiz_results_for_user_by_session(user_id=user_id, session_id=session_id)
-            if quiz_result:
-                quiz_result = quiz_result[0]
-                res = {
-                    'author_id': quiz_result['author_id'],
-                    'user_id': quiz_result['user_id'],
-                    'author_name': quiz_result['author_name'],
-                    'user_name': quiz_result['username'],
-                    'quiz_id': quiz_result['quiz_id'],
-                    'quiz_name': quiz_result['quiz_name']
-                }
-                answer_ratio = QuizResult.calculate_answers(quiz_id=quiz_result['quiz_id'], user_id=user_id,
-                                                            session_id=session_id)
-                res['correct_answers'], res['total_answers'] = answer_ratio
-                quiz_info.append(res)
-    return render_template("quizzes/history.html", quiz_info=quiz_info)
+        quiz_info = QuizResult.get_session_results_for_user(user_id=g.user['id'], search=search, cursor=cursor,
+                                                            limit=limit + 1)
+    quiz_info, next_cursor = paginate(quiz_info, limit)
+    return render_conditional("quizzes/history.html", (search, [tuple(info) for info in quiz_info]),
+                              quiz_info=quiz_info, search=search, next_cursor=next_cursor)
 
 
 class AnswerOption:
@@ -174,12 +231,11 @@ class AnswerOption:
 
         :return: rowid of added answer.
         """
-        cursor = get_db().cursor()
-        cursor.execute(
-            "INSERT INTO answer_options (text) VALUES (?)",
-            (self.text,),
-        )
-        cursor.connection.commit()
+        with transaction() as db:
+            cursor = db.execute(
+                "INSERT INTO answer_options (text) VALUES (?)",
+                (self.text,),
+            )
         self.answer_id = cursor.lastrowid
         return self.answer_id
 
@@ -265,44 +321,56 @@ class Question:
         self.options = AnswerOption.from_dict(options)
         self.answer_id, self.question_id = -1, -1
 
-    def _add_answer_option_to_db(self):
-        """Adds answer options to database and updates information of the real answer to the question."""
-        cursor = get_db().cursor()
-        for option in self.options:
-            answer_id = option.add_to_db()
-            if option.checked:
-                self.answer_id = answer_id
-            cursor.execute(
-                "INSERT INTO question_answer_rel (question_id, answer_option_id) VALUES (?, ?)",
-                (self.question_id, answer_id),
-            )
-        cursor.connection.commit()
-        self._update_answer()
+    def to_dict(self, with_answer=False):
+        """Converts question to a dictionary for JSON responses.
 
-    def _update_answer(self):
-        """Updates information of the real answer to the question in database."""
-        db = get_db()
-        db.execute(
-            "UPDATE questions SET answer_id = (?) WHERE id = (?)",
-            (self.answer_id, self.question_id),
-        )
-        db.commit()
+        :param with_answer: mark the real answer among the options.
+        :return: dictionary with question ID, text and options.
+        """
+        options = []
+        for option in self.options:
+            option_dict = {"id": option.answer_id, "text": option.text}
+            if with_answer:
+                option_dict["correct"] = option.answer_id == self.answer_id
+            options.append(option_dict)
+        return {"id": self.question_id, "text": self.text, "options": options}
 
     def add_to_db(self):
         """Adds question with options to database.
 
         :return: rowid of added question.
         """
-        cursor = get_db().cursor()
-        cursor.execute(
-            "INSERT INTO questions (answer_id, text) VALUES (?, ?)",
-            (-1, self.text),
-        )
-        cursor.connection.commit()
-        self.question_id = cursor.lastrowid
-        self._add_answer_option_to_db()
+        Question.add_many_to_db([self])
         return self.question_id
 
+    @staticmethod
+    def add_many_to_db(questions):
+        """Adds questions with their options to database in a single transaction using batched inserts.
+
+        Identifiers are allocated upfront while the write lock is held, so every question and option
+        gets its ID before the insert and the real answer is stored along with the question.
+
+        :param questions: list of Question objects.
+        :return: list of rowids of added questions.
+        """
+        with transaction() as db:
+            next_question_id, next_answer_id = next_id("questions"), next_id("answer_options")
+            answer_rows, question_rows, rel_rows = [], [], []
+            for question in questions:
+                question.question_id, next_question_id = next_question_id, next_question_id + 1
+                for option in question.options:
+                    option.answer_id, next_answer_id = next_answer_id, next_answer_id + 1
+                    if option.checked:
+                        question.answer_id = option.answer_id
+                    answer_rows.append((option.answer_id, option.text))
+                    rel_rows.append((question.question_id, option.answer_id))
+                question_rows.append((question.question_id, question.answer_id, question.text))
+
+            db.executemany("INSERT INTO answer_options (id, text) VALUES (?, ?)", answer_rows)
+            db.executemany("INSERT INTO questions (id, answer_id, text) VALUES (?, ?, ?)", question_rows)
+            db.executemany("INSERT INTO question_answer_rel (question_id, answer_option_id) VALUES (?, ?)", rel_rows)
+        return [question.question_id for question in questions]
+
     def delete_from_db(self):
         """Deletes a question with it's options from database."""
         db = get_db()
@@ -355,25 +423,42 @@ class Question:
         :param question_id: question ID.
         :return: Question object.
         """
-        db = get_db()
-        question_db = db.execute(
-            "SELECT id, answer_id, text FROM questions WHERE id = ?",
-            (question_id,),
-        ).fetchone()
-        options_db = db.execute(
-            "SELECT question_id, answer_option_id FROM question_answer_rel WHERE question_id = ?",
+        rows = get_db().execute(
+            """SELECT que.id AS question_id, que.text AS question_text, que.answer_id,
+                ao.id AS option_id, ao.text AS option_text
+            FROM questions que
+            LEFT JOIN question_answer_rel qar ON qar.question_id = que.id
+            LEFT JOIN answer_options ao ON ao.id = qar.answer_option_id
+            WHERE que.id = ?
+            ORDER BY qar.rowid
+            """,
             (question_id,),
         ).fetchall()
-        options = []
-        for option in options_db:
-            answer = AnswerOption.from_answer_id(option['answer_option_id'])
-            if answer.answer_id == question_db['answer_id']:
-                answer.checked = True
-            options.append(answer)
-        question = Question(text=question_db['text'], options=options)
-        question.question_id = question_id
-        question.answer_id = question_db['answer_id']
-        return question
+        return Question.from_rows(rows)[0]
+
+    @staticmethod
+    def from_rows(rows):
+        """Creates objects from joined rows of questions with their answer options.
+
+        Rows should be ordered by question, each row contains `question_id`, `question_text`, `answer_id`,
+        `option_id` and `option_text` columns. Option columns are NULL for a question without options.
+
+        :param rows: database query list.
+        :return: list of Question objects.
+        """
+        questions = []
+        question = None
+        for row in rows:
+            if question is None or question.question_id != row['question_id']:
+                question = Question(text=row['question_text'], options=[])
+                question.question_id = row['question_id']
+                question.answer_id = row['answer_id']
+                questions.append(question)
+            if row['option_id'] is not None:
+                answer = AnswerOption(text=row['option_text'], checked=row['option_id'] == row['answer_id'])
+                answer.answer_id = row['option_id']
+                question.options.append(answer)
+        return questions
 
 
 class Quiz:
@@ -390,32 +475,75 @@ class Quiz:
         self.name = name
         self.questions = questions
         self.quiz_id = -1
+        self.version = 1
+
+    @staticmethod
+    def from_dict(author_id, quiz_dict):
+        """Creates object from the dictionary in the format of the create page:
+        `{"<quiz name>": {"<question text>": {"<option text>": <is real answer>, ...}, ...}}`.
+
+        :param author_id: author ID.
+        :param quiz_dict: dictionary with a single quiz.
+        :return: Quiz object.
+        :raise ValueError: if the dictionary is not in the format.
+        """
+        if not isinstance(quiz_dict, dict) or len(quiz_dict) != 1:
+            raise ValueError(locale.error_wrong_data)
+        (name, questions), = quiz_dict.items()
+        if not isinstance(questions, dict) or not all(isinstance(options, dict) for options in questions.values()):
+            raise ValueError(locale.error_wrong_data)
+        if not all(isinstance(checked, bool) for options in questions.values() for checked in options.values()):
+            raise ValueError(locale.error_wrong_data)
+        return Quiz(author_id=author_id, name=name,
+                    questions=[Question(text=text, options=options) for text, options in questions.items()])
+
+    def to_create_dict(self):
+        """Converts quiz to a dictionary in the format of the create page, see `from_dict`.
+
+        :return: dictionary with a single quiz.
+        """
+        return {self.name: {question.text: {option.text: option.answer_id == question.answer_id
+                                            for option in question.options}
+                            for question in self.questions}}
+
+    def to_dict(self, with_answers=False):
+        """Converts quiz to a dictionary for JSON responses.
+
+        :param with_answers: mark real answers of questions.
+        :return: dictionary with quiz ID, name, author ID, version and questions.
+        """
+        return {"id": self.quiz_id, "name": self.name, "author_id": self.author_id, "version": self.version,
+                "questions": [question.to_dict(with_answer=with_answers) for question in self.questions]}
 
     def add_to_db(self):
         """Adds quiz with questions to database.
 
         :return: rowid of added quiz.
         """
-        cursor = get_db().cursor()
-        cursor.execute(
-            "INSERT INTO quizzes (name, author_id) VALUES (?, ?)",
-            (self.name, self.author_id),
-        )
-        cursor.connection.commit()
-        self.quiz_id = cursor.lastrowid
-        self._add_questions_to_quiz()
+        Quiz.add_many_to_db([self])
         return self.quiz_id
 
-    def _add_questions_to_quiz(self):
-        """Adds questions for quiz to database."""
-        db = get_db()
-        for question in self.questions:
-            question.add_to_db()
-            db.execute(
+    @staticmethod
+    def add_many_to_db(quizzes):
+        """Adds quizzes with their questions to database in a single transaction using batched inserts.
+
+        :param quizzes: list of Quiz objects.
+        :return: list of rowids of added quizzes.
+        """
+        with transaction() as db:
+            next_quiz_id = next_id("quizzes")
+            for quiz in quizzes:
+                quiz.quiz_id, next_quiz_id = next_quiz_id, next_quiz_id + 1
+            db.executemany(
+                "INSERT INTO quizzes (id, name, author_id) VALUES (?, ?, ?)",
+                [(quiz.quiz_id, quiz.name, quiz.author_id) for quiz in quizzes],
+            )
+            Question.add_many_to_db([question for quiz in quizzes for question in quiz.questions])
+            db.executemany(
                 "INSERT INTO quiz_question_rel (quiz_id, question_id) VALUES (?, ?)",
-                (self.quiz_id, question.question_id),
+                [(quiz.quiz_id, question.question_id) for quiz in quizzes for question in quiz.questions],
             )
-        db.commit()
+        return [quiz.quiz_id for quiz in quizzes]
 
     def delete_from_db(self):
         """Deletes a quiz with it's questions from database."""
@@ -431,6 +559,90 @@ class Quiz:
         db.commit()
         for question in self.questions:
             question.delete_from_db()
+        get_quiz_cache().delete(self.quiz_id)
+
+    def update_in_db(self, new_quiz):
+        """Updates the quiz in database to match the new quiz, applying only the changes between them.
+
+        Questions and options are matched by their text, so matched ones keep their IDs and links from stored
+        results, while changed ones are added as new rows and the old rows are deleted. All changes are applied
+        in a single transaction and the version of the quiz is increased if anything was changed.
+
+        :param new_quiz: Quiz object with the new content, gets IDs of the updated quiz.
+        :return: True if the quiz was changed.
+        :raise ValueError: if the quiz was changed since it was loaded.
+        """
+        question_pairs, removed_questions = match_by_text(self.questions, new_quiz.questions)
+        removed_options = [option for question in removed_questions for option in question.options]
+        added_questions, question_updates, option_inserts, rel_inserts, rewritten_rels = [], [], [], [], []
+
+        with transaction() as db:
+            next_answer_id = next_id("answer_options")
+            for question, new_question in question_pairs:
+                if question is None:
+                    added_questions.append(new_question)
+                    continue
+                new_question.question_id = question.question_id
+                option_pairs, removed = match_by_text(question.options, new_question.options)
+                removed_options.extend(removed)
+                for option, new_option in option_pairs:
+                    if option is None:
+                        new_option.answer_id, next_answer_id = next_answer_id, next_answer_id + 1
+                        option_inserts.append((new_option.answer_id, new_option.text))
+                    else:
+                        new_option.answer_id = option.answer_id
+                    if new_option.checked:
+                        new_question.answer_id = new_option.answer_id
+                if new_question.answer_id != question.answer_id:
+                    question_updates.append((new_question.answer_id, new_question.question_id))
+
+                removed_ids = {option.answer_id for option in removed}
+                kept_ids = [option.answer_id for option in question.options if option.answer_id not in removed_ids]
+                new_ids = [option.answer_id for option in new_question.options]
+                if new_ids[:len(kept_ids)] != kept_ids:
+                    rewritten_rels.append((new_question.question_id,))
+                    kept_ids = []
+                rel_inserts.extend((new_question.question_id, answer_id) for answer_id in new_ids[len(kept_ids):])
+
+            db.executemany("DELETE FROM answer_options WHERE id = ?", [(option.answer_id,) for option in removed_options])
+            db.executemany("DELETE FROM question_answer_rel WHERE answer_option_id = ?",
+                           [(option.answer_id,) for option in removed_options])
+            db.executemany("DELETE FROM question_answer_rel WHERE question_id = ?", rewritten_rels)
+            db.executemany("INSERT INTO answer_options (id, text) VALUES (?, ?)", option_inserts)
+            db.executemany("INSERT INTO question_answer_rel (question_id, answer_option_id) VALUES (?, ?)", rel_inserts)
+            db.executemany("UPDATE questions SET answer_id = ? WHERE id = ?", question_updates)
+            db.executemany("DELETE FROM questions WHERE id = ?",
+                           [(question.question_id,) for question in removed_questions])
+            db.executemany("DELETE FROM quiz_question_rel WHERE quiz_id = ? AND question_id = ?",
+                           [(self.quiz_id, question.question_id) for question in removed_questions])
+            Question.add_many_to_db(added_questions)
+
+            removed_ids = {question.question_id for question in removed_questions}
+            kept_ids = [question.question_id for question in self.questions if question.question_id not in removed_ids]
+            new_ids = [question.question_id for question in new_quiz.questions]
+            if new_ids[:len(kept_ids)] != kept_ids:
+                db.execute("DELETE FROM quiz_question_rel WHERE quiz_id = ?", (self.quiz_id,))
+                kept_ids = []
+            db.executemany(
+                "INSERT INTO quiz_question_rel (quiz_id, question_id) VALUES (?, ?)",
+                [(self.quiz_id, question_id) for question_id in new_ids[len(kept_ids):]],
+            )
+
+            changed = any([new_quiz.name != self.name, removed_options, rewritten_rels, option_inserts,
+                           question_updates, removed_questions, added_questions,
+                           new_ids != [question.question_id for question in self.questions]])
+            # The changes are made against the loaded version, they are rolled back if another edit was saved
+            # meanwhile, so concurrent edits can't mix.
+            cursor = db.execute(
+                "UPDATE quizzes SET name = ?, version = version + ? WHERE id = ? AND version = ?",
+                (new_quiz.name, int(changed), self.quiz_id, self.version),
+            )
+            if cursor.rowcount == 0:
+                raise ValueError(locale.error_quiz_changed)
+        new_quiz.quiz_id = self.quiz_id
+        new_quiz.version = self.version + 1 if changed else self.version
+        get_quiz_cache().delete(self.quiz_id)
+        return changed
 
     def validate(self):
         """Validates that current object has no errors with it's properties.
@@ -440,6 +652,13 @@ class Quiz:
         if self.author_id != g.user["id"]:
             abort(403)
 
+        return self.validate_content()
+
+    def validate_content(self):
+        """Validates name and questions of the quiz regardless of the current user.
+
+        :return: list of errors if they were found.
+        """
         errors = []
         if not self.name:
             errors.append(locale.error_no_quiz_name)
@@ -455,92 +674,166 @@ class Quiz:
     def from_quiz_id(quiz_id):
         """Creates object from given quiz ID.
 
+        Built quizzes are cached and reused until the version of the quiz is changed.
+        Cached objects are shared between requests and should not be modified.
+
         :param quiz_id: quiz ID.
         :return: Quiz object.
         """
         db = get_db()
         quiz_db = db.execute(
-            "SELECT q.id, q.name, q.author_id FROM quizzes q WHERE q.id = ?",
+            "SELECT q.id, q.name, q.author_id, q.version FROM quizzes q WHERE q.id = ?",
             (quiz_id,),
         ).fetchone()
 
         if quiz_db is None:
             abort(404, locale.error_no_quiz_id.format(quiz_id=quiz_id))
 
-        question_rels = db.execute(
-            """SELECT qqr.quiz_id, qqr.question_id
+        cache = get_quiz_cache()
+        cached = cache.get(quiz_id)
+        if cached is not None and cached.version == quiz_db['version']:
+            return cached
+
+        rows = db.execute(
+            """SELECT que.id AS question_id, que.text AS question_text, que.answer_id,
+                ao.id AS option_id, ao.text AS option_text
             FROM quiz_question_rel qqr
+            JOIN questions que ON que.id = qqr.question_id
+            LEFT JOIN question_answer_rel qar ON qar.question_id = que.id
+            LEFT JOIN answer_options ao ON ao.id = qar.answer_option_id
             WHERE qqr.quiz_id = ?
+            ORDER BY qqr.rowid, qar.rowid
             """,
             (quiz_id,),
         ).fetchall()
-        questions = []
-        for rel in question_rels:
-            question_id = rel['question_id']
-            question = Question.from_question_id(question_id)
-            questions.append(question)
+        questions = Question.from_rows(rows)
         quiz = Quiz(author_id=quiz_db['author_id'], name=quiz_db['name'], questions=questions)
         quiz.quiz_id = quiz_id
+        quiz.version = quiz_db['version']
+        cache.set(quiz_id, quiz)
         return quiz
 
     @staticmethod
-    def select_by_author_id(author_id):
-        """Select quizzes by author.
-
-        :param author_id: author ID.
+    def _select(conditions, params, search=None, cursor=None, limit=None):
+        """Select quizzes with their author's names, newest first.
+
+        :param conditions: list of SQL conditions for `quizzes` (aliased as `q`) and `user` (aliased as `u`) rows.
+        :param params: list of parameters for the conditions.
+        :param search: text to search in names of quizzes and authors.
+        :param cursor: ID of the last quiz from the previous page, only older quizzes will be selected.
+        :param limit: maximum number of quizzes to select.
         :return: database query list.
         """
+        conditions, params = list(conditions), list(params)
+        if search:
+            conditions.append("(q.name LIKE ? ESCAPE '\\' OR u.username LIKE ? ESCAPE '\\')")
+            params.extend([like_pattern(search)] * 2)
+        if cursor is not None:
+            conditions.append("q.id < ?")
+            params.append(cursor)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
         return get_db().execute(
-            """SELECT q.id, q.name, q.author_id, u.username as author_name
+            f"""SELECT q.id, q.name, q.author_id, q.version, u.username as author_name
             FROM quizzes q
             JOIN user u ON q.author_id = u.id
-            WHERE q.author_id = ?
+            {where}
             ORDER BY q.id DESC
+            LIMIT ?
             """,
-            (author_id,),
+            (*params, -1 if limit is None else limit),
         ).fetchall()
 
     @staticmethod
-    def select_available_to_solve():
+    def select_by_author_id(author_id, search=None, cursor=None, limit=None):
+        """Select quizzes by author.
+
+        :param author_id: author ID.
+        :param search: text to search in names of quizzes and authors.
+        :param cursor: ID of the last quiz from the previous page.
+        :param limit: maximum number of quizzes to select.
+        :return: database query list.
+        """
+        return Quiz._select(["q.author_id = ?"], [author_id], search=search, cursor=cursor, limit=limit)
+
+    @staticmethod
+    def select_available_to_solve(search=None, cursor=None, limit=None):
         """Select all available quizzes.
 
+        :param search: text to search in names of quizzes and authors.
+        :param cursor: ID of the last quiz from the previous page.
+        :param limit: maximum number of quizzes to select.
         :return: database query list.
         """
-        return get_db().execute(
-            """SELECT q.id, q.name, q.author_id, u.username as author_name
-            FROM quizzes q
-            JOIN user u ON q.author_id = u.id
-            ORDER BY q.id DESC
-            """
-        ).fetchall()
+        return Quiz._select([], [], search=search, cursor=cursor, limit=limit)
+
+    def validate_answers(self, answers):
+        """Validates that every answered question and selected answer belongs to the quiz.
+
+        :param answers: list of (question ID, answer ID) pairs.
+        :return: list of errors if they were found.
+        """
+        options = {str(question.question_id): {str(option.answer_id) for option in question.options}
+                   for question in self.questions}
+        errors = []
+        for question_id, answer_id in answers:
+            if question_id not in options:
+                errors.append(locale.error_no_question_id.format(question_id=question_id))
+            if answer_id not in options.get(question_id, ()):
+                errors.append(locale.error_no_answer_id.format(answer_id=answer_id))
+        return errors
 
-    def write_answer_result(self, user_id, question_id, answer_id):
-        """Writes result of an answer for quiz.
+    def calculate_answers(self, answers):
+        """Calculates right answers for given answers to the quiz.
+
+        :param answers: list of (question ID, answer ID) pairs.
+        :return: tuple of (num of correct answers, num of all questions in quiz)
+        """
+        real_answers = {str(question.question_id): str(question.answer_id) for question in self.questions}
+        num_correct_answers = len([answer_id for question_id, answer_id in answers
+                                   if real_answers.get(question_id) == answer_id])
+        return num_correct_answers, len(self.questions)
+
+    def write_answer_results(self, user_id, answers, session_id):
+        """Writes results of answers for quiz along with the score of the session in a single transaction
+        and marks the session as completed.
+
+        If RESULT_WRITE_BEHIND is enabled, the results are queued and written in background.
 
         :param user_id: user ID who is solving the quiz.
-        :param question_id: question ID which was answered.
-        :param answer_id: answer ID which was selected.
+        :param answers: list of (question ID, answer ID) pairs.
+        :param session_id: quiz session ID.
+        :return: tuple of (num of correct answers, num of all questions in quiz)
+        :raise ValueError: if the session is not in progress.
         """
-        db = get_db()
-        db.execute(
-            """INSERT INTO quiz_result (user_id, quiz_id, quiz_session_id, question_id, answer_id)
-                VALUES (?, ?, ?, ?, ?)""",
-            (user_id, self.quiz_id, session['quiz_session_id'], question_id, answer_id),
-        )
-        db.commit()
+        answers_ratio = self.calculate_answers(answers)
+        submission = (user_id, self.quiz_id, session_id, answers, answers_ratio)
+        if current_app.config["RESULT_WRITE_BEHIND"]:
+            # The writer checks the session again, this check only reports resubmissions to the user
+            if get_db().execute(
+                    """SELECT 1 FROM quiz_session
+                        WHERE id = ? AND user_id = ? AND quiz_id = ? AND status = 'in_progress'""",
+                    (session_id, user_id, self.quiz_id)).fetchone() is None:
+                raise ValueError(locale.error_session_not_in_progress)
+            get_result_writer().submit(submission)
+        else:
+            QuizResult.write_submissions([submission])
+        return answers_ratio
 
     @staticmethod
-    def create_session_for_user(user_id):
-        """Creates new quiz session ID for given user and sets it in the session.
+    def create_session_for_user(user_id, quiz_id=None):
+        """Creates new quiz session for given user.
 
         :param user_id: user ID.
+        :param quiz_id: ID of the quiz which is going to be solved.
+        :return: quiz session ID.
         """
-        next_session = get_db().execute(
-            "SELECT IFNULL(MAX(quiz_session_id) + 1, 1) AS quiz_session_id FROM quiz_result WHERE user_id = ?",
-            (user_id,),
-        ).fetchone()
-        session['quiz_session_id'] = next_session['quiz_session_id']
-        print(f"Created new session {session['quiz_session_id']} for user {user_id}")
+        with transaction() as db:
+            cursor = db.execute(
+                "INSERT INTO quiz_session (user_id, quiz_id) VALUES (?, ?)",
+                (user_id, quiz_id),
+            )
+        current_app.logger.debug(f"Created new session {cursor.lastrowid} for user {user_id}")
+        return cursor.lastrowid
 
 
 class QuizResult:
@@ -589,6 +882,97 @@ class QuizResult:
             (author_id,),
         ).fetchall()
 
+    @staticmethod
+    def _select_session_results(condition, params, search=None, cursor=None, limit=None):
+        """Select scores of quiz sessions, in order the sessions were submitted.
+
+        Every row contains information about the quiz, it's author and student along with the number
+        of correct answers and the total number of questions of the quiz in the session.
+
+        :param condition: SQL condition for `quiz_session_score` (aliased as `s`) and `quizzes` (aliased as `q`) rows.
+        :param params: parameters of the condition.
+        :param search: text to search in names of quizzes, authors and students.
+        :param cursor: ID of the last session score from the previous page, only later sessions will be selected.
+        :param limit: maximum number of sessions to select.
+        :return: database query list.
+        """
+        return QuizResult._query_session_results(condition, params, search=search, cursor=cursor,
+                                                 limit=limit).fetchall()
+
+    @staticmethod
+    def _query_session_results(condition, params, search=None, cursor=None, limit=None):
+        """Execute the query of `_select_session_results` without fetching the rows.
+
+        :return: database cursor, rows are fetched while iterating over it.
+        """
+        params = list(params)
+        if search:
+            condition = f"{condition} AND (q.name LIKE ? ESCAPE '\\' OR a.username LIKE ? ESCAPE '\\' " \
+                        f"OR u.username LIKE ? ESCAPE '\\')"
+            params.extend([like_pattern(search)] * 3)
+        if cursor is not None:
+            condition = f"{condition} AND s.id > ?"
+            params.append(cursor)
+        return get_db().execute(
+            f"""SELECT s.id, s.user_id, u.username AS user_name, q.author_id, a.username AS author_name,
+                s.quiz_id, q.name AS quiz_name, s.quiz_session_id, s.correct_answers, s.total_answers, s.created
+            FROM quiz_session_score s
+            JOIN quizzes q ON q.id = s.quiz_id
+            JOIN user a ON a.id = q.author_id
+            JOIN user u ON u.id = s.user_id
+            WHERE {condition}
+            ORDER BY s.id
+            LIMIT ?
+            """,
+            (*params, -1 if limit is None else limit),
+        )
+
+    @staticmethod
+    def get_session_results_for_user(user_id, search=None, cursor=None, limit=None):
+        """Get results aggregated by quiz session for given user.
+
+        :param user_id: user ID.
+        :param search: text to search in names of quizzes, authors and students.
+        :param cursor: ID of the last session from the previous page.
+        :param limit: maximum number of sessions to select.
+        :return: database query list.
+        """
+        return QuizResult._select_session_results("s.user_id = ?", (user_id,),
+                                                  search=search, cursor=cursor, limit=limit)
+
+    @staticmethod
+    def get_session_results_for_author(author_id, search=None, cursor=None, limit=None):
+        """Get results aggregated by quiz session for quizzes with given author.
+
+        :param author_id: author ID.
+        :param search: text to search in names of quizzes, authors and students.
+        :param cursor: ID of the last session from the previous page.
+        :param limit: maximum number of sessions to select.
+        :return: database query list.
+        """
+        return QuizResult._select_session_results("q.author_id = ?", (author_id,),
+                                                  search=search, cursor=cursor, limit=limit)
+
+    @staticmethod
+    def iter_session_results(author_id=None, user_id=None, quiz_id=None, since=None, until=None, cursor=None):
+        """Iterate over results aggregated by quiz session without loading all of them in memory.
+
+        :param author_id: author ID of quizzes, all authors if not given.
+        :param user_id: user ID of students, all students if not given.
+        :param quiz_id: quiz ID, all quizzes if not given.
+        :param since: only sessions submitted at this time or later, as `YYYY-MM-DD HH:MM:SS` string.
+        :param until: only sessions submitted before this time, as `YYYY-MM-DD HH:MM:SS` string.
+        :param cursor: ID of the last session which was already read.
+        :return: database cursor.
+        """
+        conditions, params = [], []
+        for condition, value in (("q.author_id = ?", author_id), ("s.user_id = ?", user_id), ("s.quiz_id = ?", quiz_id),
+                                 ("s.created >= ?", since), ("s.created < ?", until)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        return QuizResult._query_session_results(" AND ".join(conditions) or "1", params, cursor=cursor)
+
     @staticmethod
     def calculate_answers(quiz_id, user_id, session_id):
         """Calculates right answer for given quiz result.
@@ -598,10 +982,64 @@ class QuizResult:
         :param session_id: quiz session ID.
         :return: tuple of (num of correct answers, num of all questions in quiz)
         """
-        quiz = Quiz.from_quiz_id(quiz_id=quiz_id)
-        num_questions = len(quiz.questions)
-        num_correct_answers = 0
-        for result in QuizResult.get_quiz_results_for_user_by_session(user_id=user_id, session_id=session_id):
-            if result['answer_id'] == result['real_answer_id']:
-                num_correct_answers += 1
-        return num_correct_answers, num_questions
+        # Unary + keeps SQLite off quiz_result_quiz_idx, a session has few rows by (user_id, quiz_session_id)
+        result = get_db().execute(
+            """SELECT IFNULL(SUM(qr.answer_id = que.answer_id), 0) AS correct_answers,
+                (SELECT COUNT(*) FROM quiz_question_rel WHERE quiz_id = ?) AS total_answers
+            FROM quiz_result qr
+            JOIN quiz_question_rel qqr ON qqr.quiz_id = qr.quiz_id AND qqr.question_id = qr.question_id
+            JOIN questions que ON que.id = qr.question_id
+            WHERE +qr.quiz_id = ? AND qr.user_id = ? AND qr.quiz_session_id = ?
+            """,
+            (quiz_id, quiz_id, user_id, session_id),
+        ).fetchone()
+        return result['correct_answers'], result['total_answers']
+
+    @staticmethod
+    def write_submissions(submissions):
+        """Writes results and scores of submitted quiz sessions and marks the sessions as completed
+        in a single transaction.
+
+        :param submissions: list of (user ID, quiz ID, quiz session ID, list of (question ID, answer ID) pairs,
+            tuple of (num of correct answers, num of all questions in quiz)) tuples.
+        :raise ValueError: if any of the sessions is not in progress, nothing is written then.
+        """
+        with transaction() as db:
+            # Sessions are completed first, so a resubmitted session doesn't get a second set of results
+            cursor = db.executemany(
+                """UPDATE quiz_session SET status = 'completed', finished = CURRENT_TIMESTAMP
+                    WHERE id = ? AND user_id = ? AND quiz_id = ? AND status = 'in_progress'""",
+                [(session_id, user_id, quiz_id) for user_id, quiz_id, session_id, _, _ in submissions],
+            )
+            if cursor.rowcount != len(submissions):
+                raise ValueError(locale.error_session_not_in_progress)
+            db.executemany(
+                """INSERT INTO quiz_result (user_id, quiz_id, quiz_session_id, question_id, answer_id)
+                    VALUES (?, ?, ?, ?, ?)""",
+                [(user_id, quiz_id, session_id, question_id, answer_id)
+                 for user_id, quiz_id, session_id, answers, _ in submissions
+                 for question_id, answer_id in answers],
+            )
+            db.executemany(
+                """INSERT OR REPLACE INTO quiz_session_score
+                    (user_id, quiz_session_id, quiz_id, correct_answers, total_answers)
+                    VALUES (?, ?, ?, ?, ?)""",
+                [(user_id, session_id, quiz_id, correct_answers, total_answers)
+                 for user_id, quiz_id, session_id, _, (correct_answers, total_answers) in submissions],
+            )
+
+    @staticmethod
+    def get_score(user_id, session_id):
+        """Get stored score of given quiz session.
+
+        :param user_id: user ID.
+        :param session_id: quiz session ID.
+        :return: tuple of (num of correct answers, num of all questions in quiz) or None if it wasn't stored.
+        """
+        score = get_db().execute(
+            """SELECT correct_answers, total_answers
+                FROM quiz_session_score
+                WHERE user_id = (?) AND quiz_session_id = (?)""",
+            (user_id, session_id),
+        ).fetchone()
+        return (score['correct_answers'], score['total_answers']) if score else None
@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class RateLimiter:
+    """Token bucket rate limiter by key, e.g. by IP address of the client.
+
+    Every key has a bucket of `capacity` tokens that is refilled at `capacity / period` tokens per second.
+    Limits are kept in memory of the process, so with several worker processes the overall limit is multiplied.
+    """
+
+    def __init__(self, capacity, period, max_keys=10000):
+        """Class initialization.
+
+        :param capacity: maximum number of requests in a burst.
+        :param period: time in seconds to refill the whole bucket.
+        :param max_keys: maximum number of tracked keys, least recently used keys are forgotten.
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """Take a token from the bucket of the key.
+
+        :param key: key of the bucket.
+        :return: 0 if the token was taken, otherwise number of seconds until a token is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def refund(self, key):
+        """Return a token taken by `acquire` to the bucket of the key, e.g. when the request turned out not to count.
+
+        :param key: key of the bucket.
+        """
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(self.capacity, tokens + 1), updated)
@@ -1,5 +1,8 @@
 -- Initialize the database.
 -- Drop any existing data and create empty tables.
+-- Migrations from the `migrations` folder are applied on top of it by `init_db`.
+
+PRAGMA user_version = 0;
 
 DROP TABLE IF EXISTS user;
 DROP TABLE IF EXISTS answer_options;
@@ -8,6 +11,8 @@ DROP TABLE IF EXISTS question_answer_rel;
 DROP TABLE IF EXISTS quizzes;
 DROP TABLE IF EXISTS quiz_question_rel;
 DROP TABLE IF EXISTS quiz_result;
+DROP TABLE IF EXISTS quiz_session_score;
+DROP TABLE IF EXISTS quiz_session;
 DROP VIEW IF EXISTS quiz_results;
 
 CREATE TABLE user (
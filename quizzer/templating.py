@@ -0,0 +1,56 @@
+import os
+
+from flask import current_app, render_template
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+from quizzer.cache import LRUCache
+from quizzer.localization import locale
+
+
+def fragment(template_name, key, **context):
+    """Render a sub-template once and reuse the markup while the key stays the same.
+
+    The language of the current request is a part of the key, so the key should only identify the data the
+    fragment depends on, e.g. ID and version of a quiz. Used in templates as
+    `{{ fragment("quizzes/_questions.html", (quiz.quiz_id, quiz.version), quiz=quiz) }}`.
+
+    :param template_name: name of the sub-template.
+    :param key: hashable key of the data which the fragment is rendered from.
+    :param context: variables for the sub-template.
+    :return: rendered markup.
+    """
+    cache = current_app.extensions["fragment_cache"]
+    cache_key = (template_name, locale.current_lang, key)
+    markup = cache.get(cache_key)
+    if markup is None:
+        markup = Markup(render_template(template_name, **context))
+        cache.set(cache_key, markup)
+    return markup
+
+
+def precompile_templates(app):
+    """Load all templates of the app, so they are compiled before the first request.
+
+    :param app: Flask app.
+    :return: number of compiled templates.
+    """
+    names = app.jinja_env.list_templates(extensions=["html"])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def init_app(app):
+    """Set up template caches for the Flask app. This is called by the application factory.
+
+    `TEMPLATE_BYTECODE_CACHE_DIR` keeps compiled templates on disk, so new worker processes don't compile them again.
+    `TEMPLATE_PRECOMPILE` compiles all templates on startup instead of the first requests.
+    """
+    app.extensions["fragment_cache"] = LRUCache(size=app.config["FRAGMENT_CACHE_SIZE"])
+    app.jinja_env.globals["fragment"] = fragment
+    if app.config["TEMPLATE_BYTECODE_CACHE_DIR"]:
+        os.makedirs(app.config["TEMPLATE_BYTECODE_CACHE_DIR"], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config["TEMPLATE_BYTECODE_CACHE_DIR"])
+    if app.config["TEMPLATE_PRECOMPILE"]:
+        precompile_templates(app)
@@ -0,0 +1,29 @@
+from quizzer.db import dispose_pool, get_db, get_pool, init_db, migrate_db
+from quizzer.templating import precompile_templates
+
+
+def warm_up(app):
+    """Prepare the app before serving requests: create or migrate the database and compile templates.
+
+    Database connections opened here are closed, since SQLite connections can't be shared with forked workers.
+
+    :param app: Flask app.
+    """
+    with app.app_context():
+        if get_db().execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user'").fetchone():
+            migrate_db()
+        else:
+            init_db()
+    precompile_templates(app)
+    dispose_pool(app)
+
+
+def warm_up_worker(app):
+    """Open database connections of the worker's pool, so the first requests don't wait for them.
+
+    :param app: Flask app.
+    """
+    pool = get_pool(app)
+    connections = [pool.acquire() for _ in range(pool.size)]
+    for connection in connections:
+        connection.close()
@@ -0,0 +1,248 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+_STOP = object()
+# Errors of SQLite that go away once other connections finish their transactions, other errors are not retried.
+_TRANSIENT_ERRORS = ("database is locked", "database is busy")
+
+
+class WriteBehindQueue:
+    """Queue of writes that are applied to the database by a background thread in batched transactions.
+
+    Items are written at most `interval` seconds after they were submitted. When the queue is full,
+    `submit` writes the item synchronously instead, so the queue never loses items under load.
+    Items that are still queued when the process exits are written by `drain`, which is registered with `atexit`.
+
+    Transient errors, i.e. a locked or busy database, are retried with backoff up to `max_retries` times.
+    Items that can't be written are appended to the spill file as JSON lines, so they can be written later
+    with `flask replay-results`.
+    """
+
+    def __init__(self, app, write_batch, batch_size=100, interval=0.5, queue_size=10000, spill_path=None,
+                 retry_delay=0.05, max_retry_delay=5.0, max_retries=10, drain_retries=5):
+        """Class initialization.
+
+        :param app: Flask app, the batches are written in it's application context.
+        :param write_batch: function that writes a list of items in a single transaction.
+        :param batch_size: maximum number of items in a batch.
+        :param interval: maximum time in seconds an item waits in the queue.
+        :param queue_size: maximum number of items in the queue.
+        :param spill_path: path to the file for items that can't be written.
+        :param retry_delay: delay in seconds before the first retry after a transient error, doubled on every retry.
+        :param max_retry_delay: maximum delay in seconds between retries.
+        :param max_retries: number of retries of a transient error.
+        :param drain_retries: number of retries of a transient error after the drain was requested.
+        """
+        self.app = app
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.interval = interval
+        self.spill_path = spill_path
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_retries = max_retries
+        self.drain_retries = drain_retries
+        self._draining = threading.Event()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+
+    def submit(self, item):
+        """Put the item to the queue, starting the writer thread if it's not running in this process.
+
+        :param item: item to pass to `write_batch`.
+        """
+        self._ensure_thread()
+        try:
+            self._queue.put(item, timeout=self.interval)
+        except queue.Full:
+            self.app.logger.warning("Write-behind queue is full, writing synchronously")
+            self.write_batch([item])
+
+    def flush(self):
+        """Wait until all submitted items are written."""
+        if self._is_running():
+            self._queue.join()
+
+    def drain(self, timeout=None):
+        """Write all submitted items and stop the writer thread.
+
+        :param timeout: maximum time in seconds to wait for the thread.
+        """
+        with self._lock:
+            if not self._is_running():
+                return
+            self._draining.set()
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _is_running(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def _ensure_thread(self):
+        """Start the writer thread, threads of the parent process don't exist after fork."""
+        with self._lock:
+            if self._is_running():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = os.getpid()
+            self._draining.clear()
+            self._thread = threading.Thread(target=self._run, name="quizzer-write-behind", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        """Wait for the first item and collect the batch until it's full or the interval passes.
+
+        :return: tuple of (list of items, whether the queue was stopped, number of items taken from the queue).
+        """
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.interval
+        while batch[-1] is not _STOP and len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        stopped = batch[-1] is _STOP
+        return [item for item in batch if item is not _STOP], stopped, len(batch)
+
+    def _run(self):
+        while True:
+            items, stopped, taken = self._next_batch()
+            try:
+                self._write(items)
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+            if stopped:
+                return
+
+    def _write(self, items):
+        """Write the batch, falling back to one transaction per item so a bad item doesn't lose the others."""
+        if not items:
+            return
+        with self.app.app_context():
+            try:
+                self._write_with_retries(items)
+                return
+            except sqlite3.OperationalError:
+                self.app.logger.exception(f"Failed to write a batch of {len(items)} items, spilling it")
+                self.spill(items)
+                return
+            except Exception:
+                self.app.logger.exception(f"Failed to write a batch of {len(items)} items, retrying one by one")
+            for item in items:
+                try:
+                    self._write_with_retries([item])
+                except Exception:
+                    self.app.logger.exception(f"Failed to write {item!r}, spilling it")
+                    self.spill([item])
+
+    def _write_with_retries(self, items):
+        """Write items, retrying transient errors with backoff up to `max_retries` times. Once the drain is requested,
+        the errors are retried only `drain_retries` times, so the process can exit.
+        """
+        delay, attempts, drain_attempts = self.retry_delay, 0, 0
+        while True:
+            try:
+                self.write_batch(items)
+                return
+            except sqlite3.OperationalError as e:
+                if not any(message in str(e) for message in _TRANSIENT_ERRORS):
+                    raise
+                attempts += 1
+                if attempts > self.max_retries:
+                    raise
+                if self._draining.is_set():
+                    drain_attempts += 1
+                    if drain_attempts > self.drain_retries:
+                        raise
+                self.app.logger.warning(f"Failed to write {len(items)} items, retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+    def spill(self, items):
+        """Append items to the spill file, one JSON line per item.
+
+        :param items: list of items.
+        """
+        if not self.spill_path:
+            self.app.logger.error(f"No spill file is configured, lost {len(items)} items: {items!r}")
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.spill_path)), exist_ok=True)
+        with self._spill_lock, open(self.spill_path, "a", encoding="utf8") as f:
+            for item in items:
+                f.write(json.dumps(item) + "\n")
+
+
+def replay_spilled(write_batch, spill_path):
+    """Write items from the spill file again. Items that still fail are kept in the file.
+
+    :param write_batch: function that writes a list of items in a single transaction.
+    :param spill_path: path to the spill file.
+    :return: tuple of (number of written items, number of items left in the file).
+    """
+    if not os.path.exists(spill_path):
+        return 0, 0
+    with open(spill_path, encoding="utf8") as f:
+        lines = [line for line in f if line.strip()]
+    written, failed = 0, []
+    for line in lines:
+        try:
+            write_batch([json.loads(line)])
+            written += 1
+        except Exception:
+            current_app.logger.exception(f"Failed to replay {line.strip()}")
+            failed.append(line)
+    with open(spill_path, "w", encoding="utf8") as f:
+        f.writelines(failed)
+    return written, len(failed)
+
+
+@click.command("replay-results")
+@with_appcontext
+def replay_results_command():
+    """Write quiz results that the write-behind queue failed to write."""
+    from quizzer.quizzes import QuizResult
+
+    written, failed = replay_spilled(QuizResult.write_submissions, current_app.config["RESULT_SPILL_FILE"])
+    click.echo(f"Written {written} results, {failed} results failed again.")
+
+
+def get_result_writer():
+    """Get the write-behind queue of quiz results of the current application."""
+    return current_app.extensions["result_writer"]
+
+
+def init_app(app):
+    """Set up the write-behind queue of quiz results if RESULT_WRITE_BEHIND is enabled.
+    This is called by the application factory.
+    """
+    app.cli.add_command(replay_results_command)
+    if not app.config["RESULT_WRITE_BEHIND"]:
+        return
+
+    from quizzer.quizzes import QuizResult
+
+    writer = WriteBehindQueue(
+        app,
+        write_batch=QuizResult.write_submissions,
+        batch_size=app.config["RESULT_WRITE_BATCH_SIZE"],
+        interval=app.config["RESULT_WRITE_INTERVAL"],
+        queue_size=app.config["RESULT_WRITE_QUEUE_SIZE"],
+        spill_path=app.config["RESULT_SPILL_FILE"],
+    )
+    app.extensions["result_writer"] = writer
+    atexit.register(writer.drain)
@@ -0,0 +1,22 @@
+"""WSGI entry point for production servers, e.g. `gunicorn -c gunicorn.conf.py quizzer.wsgi:app`.
+
+The app is created and warmed up once in the master process when the server preloads it,
+so workers start with compiled templates and a migrated database.
+
+Clients connect to the server directly by default. Behind reverse proxies, set `FORWARDED_HOPS` to their number,
+so the client's address and scheme are taken from the `X-Forwarded-*` headers they set. Don't set it otherwise,
+clients could spoof their address then.
+"""
+import os
+
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from quizzer import create_app
+from quizzer.warmup import warm_up
+
+app = create_app()
+warm_up(app)
+
+forwarded_hops = int(os.environ.get("FORWARDED_HOPS", 0))
+if forwarded_hops:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=forwarded_hops, x_proto=forwarded_hops, x_host=forwarded_hops)
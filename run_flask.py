@@ -1,8 +1,13 @@
 import os
 import subprocess
+import sys
 
 os.environ['FLASK_APP'] = 'quizzer'
-os.environ['FLASK_ENV'] = 'development'
-if not os.path.exists("instance/quizzer.sqlite"):
-    subprocess.call(['flask', 'init-db'])
-subprocess.call(['flask', 'run', '--host=0.0.0.0'])
+if os.environ.get('FLASK_ENV') == 'development' or '--dev' in sys.argv:
+    os.environ['FLASK_ENV'] = 'development'
+    if not os.path.exists("instance/quizzer.sqlite"):
+        subprocess.call(['flask', 'init-db'])
+    subprocess.call(['flask', 'run', '--host=0.0.0.0'])
+else:
+    # The production server creates or migrates the database itself, see quizzer/wsgi.py
+    os.execvp('gunicorn', ['gunicorn', '-c', 'gunicorn.conf.py', 'quizzer.wsgi:app'])
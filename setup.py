@@ -10,4 +10,9 @@ setup(
     install_requires=[
         'flask',
     ],
+    extras_require={
+        'brotli': ['brotli'],
+        'production': ['gunicorn'],
+        'asgi': ['uvicorn'],
+    },
 )
@@ -4,7 +4,7 @@ import tempfile
 import pytest
 
 from quizzer import create_app
-from quizzer.db import get_db, init_db
+from quizzer.db import dispose_pool, get_db, init_db
 
 with open(os.path.join(os.path.dirname(__file__), "data.sql"), "rb") as f:
     _data_sql = f.read().decode("utf8")
@@ -22,6 +22,7 @@ def app():
 
     yield app
 
+    dispose_pool(app)
     os.close(db_fd)
     os.unlink(db_path)
 
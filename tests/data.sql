@@ -15,4 +15,6 @@ INSERT INTO "question_answer_rel" ("question_id","answer_option_id") VALUES (1,1
 INSERT INTO "quizzes" ("id","name","author_id") VALUES (1,'Test Index Quiz',1);
 INSERT INTO "quiz_question_rel" ("quiz_id","question_id") VALUES (1,1);
 INSERT INTO "quiz_result" ("id","user_id","quiz_session_id","quiz_id","question_id","answer_id") VALUES (1,2,1,1,1,2);
+INSERT INTO "quiz_session" ("id","user_id","quiz_id","status") VALUES (1,2,1,'completed');
+INSERT INTO "quiz_session_score" ("id","user_id","quiz_session_id","quiz_id","correct_answers","total_answers") VALUES (1,2,1,1,0,1);
 COMMIT;
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from quizzer.export import RESULT_FIELDS
+
+
+@pytest.mark.parametrize("path", ("/api/v1/quizzes", "/api/v1/quizzes/1", "/api/v1/results", "/api/v1/results/export"))
+def test_api_login_required(client, path):
+    response = client.get(path)
+    assert response.status_code == 401
+    assert response.get_json()["error"] == "Unauthorized", "API should respond with JSON errors"
+
+
+def test_list_quizzes(client, auth):
+    auth.login_as_user()
+    response = client.get("/api/v1/quizzes?fields=id,name")
+    assert response.get_json() == {"items": [{"id": 1, "name": "Test Index Quiz"}], "next_cursor": None}
+    assert client.get("/api/v1/quizzes?fields=password").status_code == 400
+    assert client.get("/api/v1/quizzes?limit=0").status_code == 400
+
+
+def test_get_quiz(client, auth):
+    auth.login_as_user()
+    quiz = client.get("/api/v1/quizzes/1").get_json()
+    assert quiz["name"] == "Test Index Quiz"
+    assert [option["id"] for option in quiz["questions"][0]["options"]] == [1, 2, 3, 4]
+    assert "correct" not in quiz["questions"][0]["options"][0], "Students should not see real answers"
+    assert client.get("/api/v1/quizzes/1?fields=id,version").get_json() == {"id": 1, "version": 1}
+    assert client.get("/api/v1/quizzes/100").status_code == 404
+    auth.logout()
+
+    auth.login()
+    quiz = client.get("/api/v1/quizzes/1").get_json()
+    assert quiz["questions"][0]["options"][0]["correct"] is True, "Author should see real answers"
+    auth.logout()
+
+    auth.login(username="other", password="other")
+    assert client.get("/api/v1/quizzes/1").status_code == 403
+
+
+def test_submit_answers(client, auth):
+    auth.login_as_user()
+    response = client.post("/api/v1/quizzes/1/submissions", data=json.dumps({"answers": {"1": 1}}),
+                           content_type="application/json")
+    assert response.status_code == 201
+    assert response.get_json() == {"session_id": 2, "correct_answers": 1, "total_answers": 1}
+    assert "Set-Cookie" not in response.headers, "Submission should not change the session of the browser"
+
+    response = client.post("/api/v1/quizzes/1/submissions", data=json.dumps({"answers": {"1": 5}}),
+                           content_type="application/json")
+    assert response.status_code == 400
+    assert client.post("/api/v1/quizzes/1/submissions", data="answers").status_code == 400
+
+    results = client.get("/api/v1/results?fields=quiz_session_id,correct_answers").get_json()
+    assert results["items"] == [{"quiz_session_id": 1, "correct_answers": 0},
+                                {"quiz_session_id": 2, "correct_answers": 1}]
+
+
+def test_list_results_pagination(client, auth):
+    auth.login_as_user()
+    for _ in range(2):
+        client.post("/api/v1/quizzes/1/submissions", data=json.dumps({"answers": {"1": 1}}),
+                    content_type="application/json")
+    auth.logout()
+    auth.login()
+    page = client.get("/api/v1/results?limit=2&fields=id").get_json()
+    assert page == {"items": [{"id": 1}, {"id": 2}], "next_cursor": 2}
+    page = client.get(f"/api/v1/results?limit=2&fields=id&cursor={page['next_cursor']}").get_json()
+    assert page == {"items": [{"id": 3}], "next_cursor": None}
+
+
+def test_export_results(client, auth):
+    auth.login_as_user()
+    response = client.get("/api/v1/results/export?fields=quiz_name,user_name,correct_answers")
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == [{"quiz_name": "Test Index Quiz", "user_name": "user",
+                                                     "correct_answers": 0}]
+    auth.logout()
+
+    auth.login(username="other", password="other")
+    assert client.get("/api/v1/results/export").get_data(as_text=True) == "", \
+        "Authors should only export results of their quizzes"
+
+
+def test_export_results_csv(client, auth):
+    auth.login_as_user()
+    client.post("/api/v1/quizzes/1/submissions", data=json.dumps({"answers": {"1": 1}}),
+                content_type="application/json")
+    auth.logout()
+    auth.login()
+    response = client.get("/api/v1/results/export?format=csv&fields=quiz_session_id,user_name,correct_answers")
+    assert response.mimetype == "text/csv"
+    assert response.get_data(as_text=True).splitlines() == ["quiz_session_id,user_name,correct_answers",
+                                                            "1,user,0", "2,user,1"]
+
+    response = client.get("/api/v1/results/export?format=csv&fields=quiz_session_id&student_id=3")
+    assert response.get_data(as_text=True).splitlines() == ["quiz_session_id"]
+    response = client.get("/api/v1/results/export?fields=quiz_session_id&since=2000-01-01&until=2000-01-01")
+    assert response.get_data(as_text=True) == "", "Sessions outside of the date range should not be exported"
+    assert client.get("/api/v1/results/export?since=yesterday").status_code == 400
+    assert client.get("/api/v1/results/export?format=xlsx").status_code == 400
+
+
+def test_export_results_command(runner, app, tmp_path):
+    output = tmp_path / "results.ndjson"
+    result = runner.invoke(args=["export-results", "--format", "ndjson", "--author", "test", "--student", "user",
+                                 "--since", "2000-01-01", "--output", str(output)])
+    assert result.exit_code == 0, result.output
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [(row["quiz_name"], row["user_name"], row["correct_answers"]) for row in rows] == \
+        [("Test Index Quiz", "user", 0)]
+
+    result = runner.invoke(args=["export-results", "--quiz", "100"])
+    assert result.output.splitlines() == [",".join(RESULT_FIELDS)]
+    result = runner.invoke(args=["export-results", "--student", "nobody"])
+    assert result.exit_code != 0 and "nobody" in result.output
@@ -0,0 +1,43 @@
+import json
+
+from quizzer.db import get_db
+from quizzer.quizzes import Quiz
+
+
+def test_export_import_quizzes(runner, app, tmp_path):
+    archive = tmp_path / "quizzes.ndjson"
+    result = runner.invoke(args=["export-quizzes", str(archive), "--author", "test"])
+    assert result.exit_code == 0, result.output
+    lines = archive.read_text(encoding="utf8").splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"Test Index Quiz": {"Test Question": {"option1": True, "option2": False, "option3": False}}}
+    ]
+
+    quiz = {"Imported Quiz": {"Question": {"yes": False, "no": True}}}
+    archive.write_text("\n".join(lines + [json.dumps(quiz)] * 3) + "\n", encoding="utf8")
+    result = runner.invoke(args=["import-quizzes", str(archive), "--author", "other", "--batch-size", "2"])
+    assert result.exit_code == 0, result.output
+    assert "Imported 4 quizzes." in result.output
+
+    with app.app_context():
+        quiz_ids = [row["id"] for row in get_db().execute("SELECT id FROM quizzes WHERE author_id = 3 ORDER BY id")]
+        assert len(quiz_ids) == 4
+        assert Quiz.from_quiz_id(quiz_ids[-1]).to_create_dict() == quiz, "Quiz should round-trip the archive"
+
+    result = runner.invoke(args=["export-quizzes", "--author", "other"], input="")
+    assert result.output.count("Imported Quiz") == 3
+
+
+def test_import_quizzes_invalid(runner, app, tmp_path):
+    archive = tmp_path / "quizzes.ndjson"
+    archive.write_text(json.dumps({"Valid": {"Question": {"yes": True, "no": False}}}) + "\n" +
+                       json.dumps({"Invalid": {"Question": {"yes": False, "no": False}}}) + "\n")
+    result = runner.invoke(args=["import-quizzes", str(archive), "--author", "test"])
+    assert result.exit_code != 0
+    assert "Line 2" in result.output
+    with app.app_context():
+        assert get_db().execute("SELECT COUNT(*) FROM quizzes").fetchone()[0] == 1, \
+            "Batch with an invalid quiz should not be imported"
+
+    result = runner.invoke(args=["import-quizzes", str(archive), "--author", "user"])
+    assert result.exit_code != 0, "Quizzes can be imported only for authors"
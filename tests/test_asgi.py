@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+from quizzer.asgi import AsgiAdapter, build_environ
+
+
+def call(app, method, path, body=b"", headers=(), query_string=b""):
+    """Call ASGI app with the request and collect the response."""
+    messages = []
+    chunks = [{"type": "http.request", "body": body[:3], "more_body": True},
+              {"type": "http.request", "body": body[3:], "more_body": False}]
+
+    async def receive():
+        return chunks.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query_string, "headers": list(headers),
+             "server": ("localhost", 80), "client": ("127.0.0.1", 1234), "scheme": "http", "http_version": "1.1"}
+    asyncio.run(app(scope, receive, send))
+    start, bodies = messages[0], messages[1:]
+    assert not bodies[-1].get("more_body")
+    return start["status"], dict(start["headers"]), b"".join(message["body"] for message in bodies)
+
+
+def test_asgi_adapter(app):
+    asgi_app = AsgiAdapter(app, max_workers=2)
+    status, _, body = call(asgi_app, "GET", "/healthz")
+    assert status == 200 and json.loads(body) == {"status": "ok"}
+
+    status, headers, _ = call(asgi_app, "POST", "/auth/login", body=b"username=user&password=user",
+                              headers=[(b"content-type", b"application/x-www-form-urlencoded")])
+    assert status == 302, "Request body should be passed to the application"
+    cookie = headers[b"set-cookie"].split(b";")[0]
+
+    status, _, body = call(asgi_app, "GET", "/api/v1/results/export", query_string=b"fields=quiz_session_id",
+                           headers=[(b"cookie", cookie)])
+    assert status == 200
+    assert [json.loads(line) for line in body.splitlines()] == [{"quiz_session_id": 1}], \
+        "Streamed responses should be sent chunk by chunk"
+    asgi_app.shutdown()
+
+
+def test_asgi_body_size(app):
+    asgi_app = AsgiAdapter(app, max_workers=1, max_body_size=10)
+    body = b"username=user&password=user"
+    status, _, _ = call(asgi_app, "POST", "/auth/login", body=body)
+    assert status == 413, "Bodies larger than the limit should be rejected"
+    status, _, _ = call(asgi_app, "POST", "/auth/login", body=body, headers=[(b"content-length", b"27")])
+    assert status == 413, "Bodies should be rejected by Content-Length before they are received"
+    asgi_app.shutdown()
+
+
+def test_build_environ_duplicate_headers():
+    scope = {"method": "GET", "path": "/", "headers": [(b"cookie", b"a=1"), (b"cookie", b"b=2"),
+                                                       (b"accept", b"text/html"), (b"accept", b"*/*")]}
+    environ = build_environ(scope, b"")
+    assert environ["HTTP_COOKIE"] == "a=1; b=2"
+    assert environ["HTTP_ACCEPT"] == "text/html,*/*"
+
+
+def test_asgi_lifespan(app):
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(AsgiAdapter(app)({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
@@ -0,0 +1,62 @@
+import gzip
+import json
+import re
+
+
+def test_static_fingerprint(client):
+    response = client.get("/")
+    url = re.search(rb'href="(/static/bootstrap.min.css\?v=\w+)"', response.data).group(1).decode()
+    response = client.get(url)
+    assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+    response.close()
+
+    response = client.get("/static/bootstrap.min.css?v=outdated")
+    assert "immutable" not in response.headers.get("Cache-Control", ""), "Outdated URL should not be cached forever"
+    response.close()
+
+
+def test_compression(client):
+    response = client.get("/static/bootstrap.min.css", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data).startswith(b"/*!")
+
+    response = client.get("/auth/login", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert b'action="/auth/login"' in gzip.decompress(response.data)
+    assert "Content-Encoding" not in client.get("/auth/login").headers, "Client without gzip should get plain page"
+
+
+def test_conditional_get(client, auth):
+    auth.login_as_user()
+    for path in ("/", "/1/solve", "/history"):
+        response = client.get(path)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert client.get(path, headers={"If-None-Match": etag}).status_code == 304, f"{path} should not be rendered"
+        assert client.get(path, headers={"If-None-Match": etag, "Accept-Language": "ru"}).status_code == 200
+
+    etag = client.get("/1/solve").headers["ETag"]
+    auth.logout()
+    auth.login()
+    data = {"Test Index Quiz": {"Edited Question": {"1": True, "2": False}}}
+    client.post("/1/edit", data=json.dumps(data), content_type="application/json")
+    auth.logout()
+    auth.login_as_user()
+    assert client.get("/1/solve", headers={"If-None-Match": etag}).status_code == 200, \
+        "Edited quiz should be rendered again"
+
+
+def test_conditional_get_compressed(client, auth):
+    auth.login_as_user()
+    headers = {"Accept-Encoding": "gzip"}
+    response = client.get("/", headers=headers)
+    assert response.headers["Content-Encoding"] == "gzip"
+    etag = response.headers["ETag"]
+    assert etag.startswith("W/"), "ETag of compressed page should be weak"
+    response = client.get("/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304, "Compressed page should be revalidated by it's ETag"
+    assert client.get("/", headers={"If-None-Match": etag}).status_code == 304, \
+        "Weak ETag should match the page regardless of the encoding"
@@ -1,6 +1,7 @@
 import pytest
 from flask import g, session
 
+from quizzer.auth import invalidate_user
 from quizzer.db import get_db
 
 
@@ -69,3 +70,76 @@ def test_logout(client, auth):
     with client:
         auth.logout()
         assert "user_id" not in session
+
+
+def test_user_cache(client, auth, app):
+    auth.login()
+    client.get("/")
+    with client:
+        client.get("/")
+        assert g.user == {"id": 1, "username": "test", "is_admin": 1}, "Password hash should not be loaded"
+    assert app.extensions["user_cache"].stats()["hits"] == 1, "User should be loaded from the cache"
+
+    with app.app_context():
+        get_db().execute("UPDATE user SET is_admin = 0 WHERE id = 1")
+        get_db().commit()
+    with app.test_request_context():
+        invalidate_user(1)
+    with client:
+        client.get("/")
+        assert not g.is_admin, "Changed user should be loaded again after invalidation"
+
+
+def test_login_reloads_cached_user(client, auth, app):
+    auth.login()
+    client.get("/")
+    with app.app_context():
+        get_db().execute("UPDATE user SET username = 'renamed' WHERE id = 1")
+        get_db().commit()
+    auth.logout()
+    auth.login(username="renamed")
+    with client:
+        client.get("/")
+        assert g.user["username"] == "renamed", "User should be loaded again on log in"
+
+
+def test_static_skips_user(client, auth):
+    auth.login()
+    with client:
+        client.get("/static/base.css").close()
+        assert g.user is None, "User should not be loaded for static files"
+
+
+def test_rehash_on_login(client, auth, app):
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+    auth.login()
+    with app.app_context():
+        pwhash = get_db().execute("SELECT password FROM user WHERE id = 1").fetchone()[0]
+    assert pwhash.startswith("pbkdf2:sha256:1000$"), "Password should be hashed with the new parameters"
+    auth.logout()
+    assert auth.login().headers["Location"] == "http://localhost/", "User should log in with the new hash"
+
+
+def test_login_rate_limit(client, auth, app):
+    app.config["LOGIN_RATE_LIMIT"] = 3
+    assert auth.login().status_code == 302
+    auth.logout()
+    assert auth.login_as_user(password="a").status_code == 200
+    assert auth.login_as_user().status_code == 302
+    response = auth.login()
+    assert response.status_code == 429, "Every attempt from the address should be limited"
+    assert b"Too many attempts" in response.data
+    assert int(response.headers["Retry-After"]) > 0
+    assert client.get("/auth/login").status_code == 200, "Only attempts to log in should be limited"
+    assert client.post("/auth/register", data={"username": "a", "password": "a"}).status_code == 429
+
+
+def test_login_failure_limit(client, auth, app):
+    app.config["LOGIN_FAILURE_LIMIT"] = 2
+    for _ in range(3):
+        assert auth.login().status_code == 302, "Successful logins should not count as failures"
+        auth.logout()
+    for _ in range(2):
+        assert auth.login(password="a").status_code == 200
+    assert auth.login().status_code == 429, "Failed attempts should be limited by username"
+    assert auth.login_as_user().status_code == 302, "Other users behind the same address should not be limited"
@@ -0,0 +1,62 @@
+from quizzer.cache import FileSystemCache, LRUCache, get_quiz_cache
+from quizzer.db import get_db
+from quizzer.quizzes import Quiz
+
+
+def test_lru_cache():
+    cache = LRUCache(size=2)
+    cache.set(1, "one")
+    cache.set(2, "two")
+    assert cache.get(1) == "one"
+    cache.set(3, "three")
+    assert cache.get(2) is None, "Least recently used entry should be evicted"
+    assert cache.get(1) == "one" and cache.get(3) == "three"
+    cache.delete(1)
+    assert cache.get(1) is None
+    assert cache.stats() == {"hits": 3, "misses": 2, "size": 1}
+
+
+def test_lru_cache_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("quizzer.cache.time.monotonic", lambda: now[0])
+    cache = LRUCache(size=2, ttl=10)
+    cache.set(1, "one")
+    now[0] += 5
+    assert cache.get(1) == "one"
+    now[0] += 10
+    assert cache.get(1) is None, "Expired entry should not be returned"
+
+
+def test_file_system_cache(tmp_path):
+    cache, other_worker_cache = FileSystemCache(str(tmp_path), size=2), FileSystemCache(str(tmp_path), size=2)
+    cache.set(1, {"name": "one"})
+    assert other_worker_cache.get(1) == {"name": "one"}, "Entries should be shared through the directory"
+    other_worker_cache.delete(1)
+    assert cache.get(1) is None
+    for key in range(3):
+        cache.set(key, key)
+    assert cache.stats()["size"] == 2
+
+
+def test_quiz_cache(app):
+    with app.app_context():
+        cache = get_quiz_cache()
+        quiz = Quiz.from_quiz_id(1)
+        assert Quiz.from_quiz_id(1) is quiz
+        assert cache.stats()["hits"] == 1
+
+        db = get_db()
+        db.execute("UPDATE quizzes SET version = version + 1, name = 'Changed Quiz' WHERE id = 1")
+        db.commit()
+        assert Quiz.from_quiz_id(1).name == "Changed Quiz", "Quiz with new version should not be taken from cache"
+
+
+def test_quiz_cache_invalidation(client, auth, app):
+    auth.login()
+    client.get("/1/edit")
+    with app.app_context():
+        assert get_quiz_cache().stats()["size"] == 1
+
+    client.post("/1/delete")
+    with app.app_context():
+        assert get_quiz_cache().stats()["size"] == 0, "Deleted quiz should be removed from cache"
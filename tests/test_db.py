@@ -1,8 +1,11 @@
+import json
+import logging
 import sqlite3
 
 import pytest
 
-from quizzer.db import get_db
+from quizzer.db import dispose_pool, explain_query_plan, get_db, get_db_version, get_migrations
+from quizzer.quizzes import Quiz, QuizResult
 
 
 def test_get_close_db(app):
@@ -27,3 +30,116 @@ def test_init_db_command(runner, monkeypatch):
     result = runner.invoke(args=["init-db"])
     assert "Initialized" in result.output
     assert Recorder.called
+
+
+def test_migrate_db_command(app, runner):
+    with app.app_context():
+        db = get_db()
+        with app.open_resource("schema.sql") as f:
+            db.executescript(f.read().decode("utf8"))
+        db.executescript(
+            """INSERT INTO user (id, username, password, is_admin) VALUES (2, 'user', 'user', 0);
+            INSERT INTO answer_options (id, text) VALUES (1, 'option1'), (2, 'option2');
+            INSERT INTO questions (id, answer_id, text) VALUES (1, 1, 'Test Question');
+            INSERT INTO question_answer_rel (question_id, answer_option_id) VALUES (1, 1), (1, 2);
+            INSERT INTO quizzes (id, name, author_id) VALUES (1, 'Test Index Quiz', 1);
+            INSERT INTO quiz_question_rel (quiz_id, question_id) VALUES (1, 1);
+            INSERT INTO quiz_result (user_id, quiz_session_id, quiz_id, question_id, answer_id) VALUES (2, 1, 1, 1, 2);
+            """
+        )
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "Applied 0001_quiz_session_score.sql" in result.output
+    assert "up to date" in result.output
+
+    with app.app_context():
+        db = get_db()
+        assert get_db_version() == get_migrations()[-1][0]
+        score = db.execute("SELECT * FROM quiz_session_score").fetchone()
+        assert (score["user_id"], score["quiz_session_id"], score["correct_answers"], score["total_answers"]) == \
+               (2, 1, 0, 1), "Migration should fill in scores of already submitted results"
+        assert db.execute("SELECT COUNT(*) FROM quiz_result").fetchone()[0] == 1, "Migration should keep data"
+        assert "quizzes_author_idx" in explain_query_plan("SELECT * FROM quizzes WHERE author_id = 1")[0]
+        session_id = db.execute("INSERT INTO quiz_session (user_id) VALUES (2)").lastrowid
+        assert session_id == 2, "New sessions should not reuse IDs of sessions with results"
+
+    result = runner.invoke(args=["migrate-db"])
+    assert "Applied" not in result.output
+
+
+def test_hot_queries_use_indexes(app):
+    statements = []
+    with app.test_request_context():
+        db = get_db()
+        db.set_trace_callback(statements.append)
+        Quiz.from_quiz_id(1)
+        Quiz.select_by_author_id(author_id=1, limit=10)
+        Quiz.create_session_for_user(user_id=2)
+        QuizResult.get_session_results_for_author(author_id=1, limit=10)
+        QuizResult.get_session_results_for_user(user_id=2, limit=10)
+        QuizResult.calculate_answers(quiz_id=1, user_id=2, session_id=1)
+        QuizResult.get_score(user_id=2, session_id=1)
+        db.set_trace_callback(None)
+
+        for statement in statements:
+            plan = explain_query_plan(statement)
+            assert not [detail for detail in plan if detail.startswith("SCAN")], f"{statement}: {plan}"
+
+
+def test_pool_reuses_connections(app):
+    with app.app_context():
+        connection = get_db().connection
+        get_db().execute("INSERT INTO user (username, password) VALUES ('uncommitted', 'a')")
+
+    with app.app_context():
+        db = get_db()
+        assert db.connection is connection, "Connection should be reused by the next request"
+        assert not db.in_transaction
+        assert db.execute("SELECT * FROM user WHERE username = 'uncommitted'").fetchone() is None, \
+            "Uncommitted changes should be rolled back when the connection is returned to the pool"
+
+
+def test_pool_pragmas(app):
+    app.config["DATABASE_PRAGMAS"] = {"busy_timeout": 1234}
+    dispose_pool(app)
+
+    with app.app_context():
+        db = get_db()
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert db.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+
+
+def test_pool_disabled(app):
+    app.config["DATABASE_POOL_SIZE"] = 0
+    dispose_pool(app)
+
+    with app.app_context():
+        connection = get_db().connection
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
+
+
+def test_query_stats_header(app, client, auth):
+    auth.login()
+    assert "X-SQL-Queries" not in client.get("/").headers
+
+    app.config["SQL_DEBUG_HEADER"] = True
+    response = client.get("/")
+    assert response.headers["X-SQL-Queries"] == "1", "User should be loaded from the cache"
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+
+def test_query_stats_log(app, client, auth, caplog):
+    app.config["SQL_SLOW_QUERY_MS"] = 0
+    auth.login()
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger="quizzer.sql"):
+        client.get("/history")
+
+    events = [json.loads(record.getMessage()) for record in caplog.records if record.name == "quizzer.sql"]
+    slow_queries = [event for event in events if event["event"] == "slow_query"]
+    requests = [event for event in events if event["event"] == "request"]
+    assert len(slow_queries) == 2, "Every query should be logged as slow with zero threshold"
+    assert requests[0]["endpoint"] == "quizzes.history" and requests[0]["queries"] == 2
+    assert requests[0]["slowest"][0]["sql"].startswith("SELECT")
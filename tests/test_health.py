@@ -0,0 +1,32 @@
+from quizzer import create_app
+from quizzer.db import dispose_pool, get_db
+from quizzer.warmup import warm_up, warm_up_worker
+
+
+def test_liveness(client):
+    response = client.get("/healthz")
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ok"}
+
+
+def test_readiness(client, app):
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "ok"
+
+    with app.app_context():
+        get_db().execute("PRAGMA user_version = 1")
+    response = client.get("/readyz")
+    assert response.status_code == 503, "Instance with outdated database should not get requests"
+
+
+def test_warm_up(tmp_path):
+    app = create_app({"TESTING": True, "DATABASE": str(tmp_path / "quizzer.sqlite")})
+    warm_up(app)
+    assert "db_pool" not in app.extensions, "Connections should not be inherited by workers"
+    assert app.test_client().get("/readyz").status_code == 200, "New database should be created"
+
+    warm_up(app)
+    warm_up_worker(app)
+    assert app.extensions["db_pool"]._idle.qsize() == app.config["DATABASE_POOL_SIZE"]
+    dispose_pool(app)
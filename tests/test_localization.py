@@ -0,0 +1,29 @@
+import json
+
+from quizzer.localization import locale
+
+
+def test_locale_per_request(app):
+    with app.test_request_context(headers={"Accept-Language": "ru"}):
+        assert locale.current_lang == "ru"
+        assert locale.log_in == "Войти"
+    with app.test_request_context(headers={"Accept-Language": "en"}):
+        assert locale.current_lang == "en", "Language of the previous request should not stick"
+        assert json.loads(locale.dict())["log_in"] == "Log In"
+    with app.app_context():
+        assert locale.current_lang == "en", "Default language should be used outside of requests"
+
+
+def test_locale_script(client, auth):
+    auth.login()
+    response = client.get("/create", headers={"Accept-Language": "ru"})
+    with client.application.test_request_context(headers={"Accept-Language": "ru"}):
+        script_url = f"/locale/ru.js?v={locale.etag}"
+    assert script_url.encode() in response.data
+
+    response = client.get(script_url)
+    assert response.status_code == 200
+    assert response.data.decode("utf8").startswith("var locale = {")
+    assert "max-age=31536000" in response.headers["Cache-Control"], "Versioned script should be cached for long"
+    assert client.get(script_url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+    assert client.get("/locale/de.js").status_code == 404
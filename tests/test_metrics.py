@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from quizzer import create_app
+from quizzer.db import dispose_pool
+from quizzer.metrics import Registry, archive_stale_snapshots, merge, render
+
+
+@pytest.fixture
+def metrics_app(app):
+    app = create_app({"TESTING": True, "DATABASE": app.config["DATABASE"], "METRICS_ENABLED": True})
+    yield app
+    dispose_pool(app)
+
+
+def test_registry_render():
+    registry = Registry()
+    registry.counter("requests_total", "Requests.", ("status",)).inc(status=200)
+    registry.counter("requests_total", "Requests.", ("status",)).inc(2, status=200)
+    registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0)).observe(0.5)
+    text = render(registry.snapshot())
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{status="200"} 3.0' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0.0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1.0' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1.0' in text
+    assert "latency_seconds_sum 0.5" in text
+
+
+def test_merge_snapshots_of_processes(tmp_path):
+    first, second = Registry(directory=str(tmp_path)), Registry(directory=str(tmp_path))
+    first.counter("requests_total", "Requests.").inc()
+    second.counter("requests_total", "Requests.").inc(2)
+    first.histogram("latency_seconds", "Latency.", buckets=(1.0,)).observe(0.5)
+    second.histogram("latency_seconds", "Latency.", buckets=(1.0,)).observe(2.0)
+    merged = merge([first.snapshot(), second.snapshot()])
+    assert merged["requests_total"]["samples"] == [[[], 3]]
+    assert merged["latency_seconds"]["samples"] == [[[], [[1, 1], 2.5]]]
+
+    first.flush(force=True)
+    assert first.collect()["requests_total"]["samples"] == [[[], 1]], "Process should read it's own snapshot"
+
+
+def test_snapshots_of_exited_processes(tmp_path):
+    registry = Registry(directory=str(tmp_path))
+    registry.gauge("entries", "Entries.").set(5)
+    registry.counter("requests_total", "Requests.").inc(2)
+    registry.histogram("latency_seconds", "Latency.", buckets=(1.0,)).observe(0.5)
+    registry.flush(force=True)
+    dead_pid = subprocess.Popen([sys.executable, "-c", ""]).pid
+    os.waitpid(dead_pid, 0)
+    (tmp_path / f"metrics-{dead_pid}.json").write_text((tmp_path / f"metrics-{os.getpid()}.json").read_text())
+    collected = registry.collect()
+    assert collected["entries"]["samples"] == [[[], 5]], "Gauges of exited processes should be dropped"
+    assert collected["requests_total"]["samples"] == [[[], 4]], "Counters of exited processes should be kept"
+    assert collected["latency_seconds"]["samples"] == [[[], [[2, 0], 1.0]]]
+    assert not (tmp_path / f"metrics-{dead_pid}.json").exists()
+
+    archive_stale_snapshots(str(tmp_path))
+    assert (tmp_path / f"metrics-{os.getpid()}.json").exists(), "Snapshots of live processes should be kept"
+    registry.counter("requests_total", "Requests.").inc()
+    registry.retire()
+    assert not (tmp_path / f"metrics-{os.getpid()}.json").exists()
+    collected = Registry(directory=str(tmp_path)).collect()
+    assert collected["requests_total"]["samples"] == [[[], 5]], "Totals should not go down when processes exit"
+    assert "entries" not in collected
+
+
+def test_metrics_endpoint(metrics_app):
+    client = metrics_app.test_client()
+    client.post("/auth/login", data={"username": "user", "password": "user"})
+    client.get("/1/solve")
+    assert "quizzer_active_quiz_sessions 1.0" in client.get("/metrics").get_data(as_text=True)
+    client.post("/1/solve", data={"1": "1"})
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'quizzer_requests_total{endpoint="quizzes.solve",method="POST",status="200"} 1.0' in text
+    assert 'quizzer_request_duration_seconds_count{endpoint="quizzes.solve"} 2.0' in text
+    assert 'quizzer_request_db_seconds_count{endpoint="quizzes.solve"} 2.0' in text
+    assert "quizzer_submissions_total 1.0" in text
+    assert "quizzer_quiz_cache_hits_total" in text
+    assert "quizzer_active_quiz_sessions 0.0" in text
+    assert 'endpoint="metrics"' not in text
+
+
+def test_metrics_disabled(client):
+    assert client.get("/metrics").status_code == 404, "Metrics should be disabled by default"
+
+
+def test_metrics_token(metrics_app):
+    metrics_app.config["METRICS_TOKEN"] = "secret"
+    client = metrics_app.test_client()
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
@@ -0,0 +1,35 @@
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
+
+from quizzer.passwords import PasswordHasher
+from quizzer.ratelimit import RateLimiter
+
+
+def test_password_hasher():
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", salt_length=8, max_workers=1)
+    pwhash = hasher.hash("secret")
+    assert hasher.check(pwhash, "secret") and not hasher.check(pwhash, "wrong")
+    assert not hasher.needs_rehash(pwhash)
+    assert PasswordHasher(method="pbkdf2:sha256:2000", salt_length=8).needs_rehash(pwhash)
+    assert PasswordHasher(method="pbkdf2:sha256:1000", salt_length=16).needs_rehash(pwhash)
+
+
+def test_needs_rehash_default_iterations():
+    hasher = PasswordHasher(method="pbkdf2:sha256", salt_length=8, max_workers=1)
+    pwhash = hasher.hash("secret")
+    assert pwhash.startswith(f"pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}$")
+    assert not hasher.needs_rehash(pwhash), "Method without iterations should match werkzeug's default"
+    assert not PasswordHasher(method="pbkdf2", salt_length=8).needs_rehash(pwhash)
+    assert PasswordHasher(method="pbkdf2:sha256:150000", salt_length=8).needs_rehash(pwhash)
+
+
+def test_rate_limiter(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("quizzer.ratelimit.time.monotonic", lambda: now[0])
+    limiter = RateLimiter(capacity=2, period=10)
+    assert limiter.acquire("1.1.1.1") == 0 and limiter.acquire("1.1.1.1") == 0
+    assert limiter.acquire("1.1.1.1") == 5, "Token should be available after refill"
+    assert limiter.acquire("2.2.2.2") == 0, "Clients should be limited separately"
+    now[0] += 5
+    assert limiter.acquire("1.1.1.1") == 0
+    limiter.refund("1.1.1.1")
+    assert limiter.acquire("1.1.1.1") == 0, "Refunded token should be available again"
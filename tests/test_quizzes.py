@@ -1,8 +1,10 @@
 import json
+import sqlite3
 import pytest
 from flask import session
 
 from quizzer.db import get_db
+from quizzer.quizzes import AnswerOption, Question, Quiz, QuizResult
 
 
 def test_index(client, auth):
@@ -138,6 +140,10 @@ def test_create_edit_invalid(client, auth, path):
     assert b"error" in response.data
     assert b"Got wrong data, should be dict" in response.data
 
+    data = {"Quiz": {"Question": {"1": "yes", "2": False}}}
+    response = client.post(path, data=json.dumps(data), content_type='application/json')
+    assert b"Got wrong data, should be dict" in response.data, "Answer flags should be booleans"
+
 
 @pytest.mark.parametrize("path", ("/create", "/1/edit"))
 def test_create_edit_validate(client, auth, path):
@@ -202,7 +208,7 @@ def test_solve_valid(client, auth, app):
     with client as client_with_session:
         response = client_with_session.get("/1/solve")
         assert response.status_code == 200
-        assert session['quiz_session_id'] == 2, "User should have quiz session ID when trying to solve"
+        assert session['quiz_sessions'] == {"1": 2}, "User should have quiz session ID when trying to solve"
 
     data = {1: 1}
     response = client.post("/1/solve", data=data)
@@ -219,11 +225,8 @@ def test_solve_multiple_valid(client, auth, app):
     auth.login_as_user()
     for question_index in range(1, 5):
         new_session_id = question_index + 1
-        with client as client_with_session:
-            with client_with_session.session_transaction() as sess:
-                sess['quiz_session_id'] = new_session_id
-            data = {1: question_index}
-            response = client_with_session.post("/1/solve", data=data)
+        client.get("/1/solve")
+        response = client.post("/1/solve", data={1: question_index})
 
         assert b'Result for' in response.data
         assert b'Correct answers' in response.data
@@ -242,7 +245,7 @@ def test_solve_invalid(client, auth, app):
     with client as client_with_session:
         response = client_with_session.get("/1/solve")
         assert response.status_code == 200
-        assert session['quiz_session_id'] == 2, "User should have quiz session ID when trying to solve"
+        assert session['quiz_sessions'] == {"1": 2}, "User should have quiz session ID when trying to solve"
 
     data = {1: 2, 3: 4, 5: 6, "Invalid data": "Still invalid"}
     response = client.post("/1/solve", data=data)
@@ -275,3 +278,349 @@ def test_history_author(client, auth):
     assert b'test' in response.data, "History should show author's name 'test'"
     assert b'user' in response.data, "History should show student's name 'user'"
     assert b'0 of 1' in response.data, "History should show quiz result '0 correct answers out of 1 total'"
+
+
+def test_from_quiz_id_query_count(app):
+    def count_queries(quiz_id):
+        statements = []
+        db = get_db()
+        db.set_trace_callback(statements.append)
+        quiz = Quiz.from_quiz_id(quiz_id)
+        db.set_trace_callback(None)
+        return quiz, len(statements)
+
+    with app.app_context():
+        questions = [Question(text=f"Question {index}", options={f"Option {option}": option == 0 for option in range(5)})
+                     for index in range(50)]
+        big_quiz_id = Quiz(author_id=1, name="Big Quiz", questions=questions).add_to_db()
+
+        small_quiz, small_count = count_queries(1)
+        big_quiz, big_count = count_queries(big_quiz_id)
+
+    assert small_count == big_count, "Loading a quiz should not depend on the number of its questions"
+    assert len(small_quiz.questions) == 1
+    assert len(big_quiz.questions) == 50
+    assert [question.text for question in big_quiz.questions] == [question.text for question in questions]
+    assert all(len(question.options) == 5 for question in big_quiz.questions)
+    assert all([option.checked for option in question.options] == [True, False, False, False, False]
+               for question in big_quiz.questions)
+
+
+def test_add_to_db_ids(app):
+    with app.app_context():
+        questions = [Question(text=f"Question {index}", options={f"Option {option}": option == index % 3
+                                                                 for option in range(3)})
+                     for index in range(10)]
+        quiz = Quiz(author_id=1, name="Batched Quiz", questions=questions)
+        quiz_id = quiz.add_to_db()
+        assert quiz_id == quiz.quiz_id
+
+        loaded = Quiz.from_quiz_id(quiz_id)
+        assert [question.question_id for question in loaded.questions] == \
+               [question.question_id for question in questions]
+        for saved, original in zip(loaded.questions, questions):
+            assert saved.answer_id == original.answer_id
+            assert [option.answer_id for option in saved.options] == \
+                   [option.answer_id for option in original.options]
+            assert [option.checked for option in saved.options] == [option.checked for option in original.options]
+
+
+def test_add_to_db_rollback(app):
+    with app.app_context():
+        db = get_db()
+        counts = [db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("quizzes", "questions", "answer_options", "question_answer_rel", "quiz_question_rel")]
+        questions = [Question(text="Valid Question", options={"1": True, "2": False}),
+                     Question(text=None, options={"1": True, "2": False})]
+
+        with pytest.raises(sqlite3.IntegrityError):
+            Quiz(author_id=1, name="Broken Quiz", questions=questions).add_to_db()
+
+        assert counts == [db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                          for table in ("quizzes", "questions", "answer_options", "question_answer_rel",
+                                        "quiz_question_rel")]
+
+
+def test_history_sessions(client, auth, app):
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO quiz_session_score (user_id, quiz_session_id, quiz_id, correct_answers, "
+                   "total_answers) VALUES (2, 2, 1, 1, 1)")
+        db.commit()
+
+    auth.login()
+    response = client.get("/history")
+    assert response.data.count(b"<tr>") == 1 + 2, "History should show a row for every quiz session"
+    assert response.data.index(b"0 of 1") < response.data.index(b"1 of 1"), "Sessions should be shown in order"
+
+    auth.logout()
+    auth.login(username="other", password="other")
+    response = client.get("/history")
+    assert response.status_code == 200
+    assert b"Test Index Quiz" not in response.data, "History should not show results of other authors' quizzes"
+
+
+def test_index_pagination(client, auth, app):
+    app.config["PAGE_SIZE"] = 2
+    with app.app_context():
+        for index in range(2, 6):
+            Quiz(author_id=1, name=f"Paged Quiz {index}",
+                 questions=[Question(text="Question", options={"1": True, "2": False})]).add_to_db()
+
+    auth.login_as_user()
+    response = client.get("/")
+    assert b"Paged Quiz 5" in response.data and b"Paged Quiz 4" in response.data
+    assert b"Paged Quiz 3" not in response.data
+    assert b'name="cursor" value="4"' in response.data, "First page should link to the next page"
+
+    response = client.get("/?cursor=4")
+    assert b"Paged Quiz 3" in response.data and b"Paged Quiz 2" in response.data
+    assert b"Paged Quiz 4" not in response.data
+    assert b'name="cursor" value="2"' in response.data
+
+    response = client.get("/?cursor=2")
+    assert b"Test Index Quiz" in response.data
+    assert b'name="cursor"' not in response.data, "Last page should not link to the next page"
+
+    response = client.get("/?q=quiz+3")
+    assert b"Paged Quiz 3" in response.data
+    assert b"Paged Quiz 2" not in response.data and b"Test Index Quiz" not in response.data
+
+    assert b"Paged Quiz" not in client.get("/?q=%25").data, "Search text should not be treated as a pattern"
+
+
+def test_history_pagination(client, auth, app):
+    app.config["PAGE_SIZE"] = 1
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO quiz_session_score (user_id, quiz_session_id, quiz_id, correct_answers, "
+                   "total_answers) VALUES (2, 2, 1, 1, 1)")
+        db.commit()
+
+    auth.login()
+    response = client.get("/history")
+    assert b"0 of 1" in response.data and b"1 of 1" not in response.data
+    assert b'name="cursor" value="1"' in response.data
+
+    response = client.get("/history?cursor=1")
+    assert b"1 of 1" in response.data and b"0 of 1" not in response.data
+    assert b'name="cursor"' not in response.data
+
+    assert b"Test Index Quiz" in client.get("/history?q=index").data
+    assert b"Test Index Quiz" not in client.get("/history?q=missing").data
+
+
+def test_solve_stores_score(client, auth, app):
+    auth.login_as_user()
+    with client as client_with_session:
+        client_with_session.get("/1/solve")
+        session_id = session['quiz_sessions']["1"]
+        client_with_session.post("/1/solve", data={1: 1})
+
+    with app.app_context():
+        db = get_db()
+        score = db.execute("SELECT * FROM quiz_session_score WHERE user_id = 2 AND quiz_session_id = ?",
+                           (session_id,)).fetchone()
+        assert (score['quiz_id'], score['correct_answers'], score['total_answers']) == (1, 1, 1)
+        assert score['created'] is not None
+        db.execute("DELETE FROM quiz_result")
+        db.commit()
+
+    response = client.get("/history")
+    assert b"1 of 1" in response.data, "History should read scores stored on submission"
+
+
+def test_write_answer_results_query_count(app):
+    def count_queries(quiz, answers, session_id):
+        statements = []
+        db = get_db()
+        db.set_trace_callback(statements.append)
+        assert not quiz.validate_answers(answers)
+        answers_ratio = quiz.write_answer_results(user_id=2, answers=answers, session_id=session_id)
+        db.set_trace_callback(None)
+        return answers_ratio, len([statement for statement in statements
+                                   if not statement.startswith("INSERT INTO quiz_result")])
+
+    with app.test_request_context():
+        questions = [Question(text=f"Question {index}", options={"1": True, "2": False}) for index in range(50)]
+        big_quiz = Quiz.from_quiz_id(Quiz(author_id=1, name="Big Quiz", questions=questions).add_to_db())
+        big_answers = [(str(question.question_id), str(question.options[index % 2].answer_id))
+                       for index, question in enumerate(big_quiz.questions)]
+
+        small_session_id = Quiz.create_session_for_user(user_id=2, quiz_id=1)
+        big_session_id = Quiz.create_session_for_user(user_id=2, quiz_id=big_quiz.quiz_id)
+        small_ratio, small_count = count_queries(Quiz.from_quiz_id(1), [("1", "1")], session_id=small_session_id)
+        big_ratio, big_count = count_queries(big_quiz, big_answers, session_id=big_session_id)
+
+        assert small_ratio == (1, 1)
+        assert big_ratio == (25, 50)
+        assert small_count == big_count, "Only the batched insert of results should depend on the number of answers"
+        assert get_db().execute("SELECT COUNT(*) FROM quiz_result WHERE quiz_session_id = ?",
+                                (big_session_id,)).fetchone()[0] == 50
+        assert QuizResult.get_score(user_id=2, session_id=big_session_id) == (25, 50)
+
+
+def test_solve_session(client, auth, app):
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO user (id, username, password, is_admin) VALUES (4, 'another', ?, 0)",
+                   (db.execute("SELECT password FROM user WHERE id = 2").fetchone()[0],))
+        db.commit()
+
+    session_ids = []
+    for username in ("user", "another"):
+        auth.login_as_user(username=username, password="user")
+        with client as client_with_session:
+            client_with_session.get("/1/solve")
+            session_ids.append(session['quiz_sessions']["1"])
+        auth.logout()
+    assert session_ids == [2, 3], "Every started session should get its own ID"
+
+    with app.app_context():
+        db = get_db()
+        quiz_session = db.execute("SELECT * FROM quiz_session WHERE id = 2").fetchone()
+        assert (quiz_session['user_id'], quiz_session['quiz_id'], quiz_session['status']) == (2, 1, 'in_progress')
+        assert quiz_session['started'] is not None and quiz_session['finished'] is None
+
+    auth.login_as_user()
+    with client as client_with_session:
+        with client_with_session.session_transaction() as sess:
+            sess['quiz_sessions'] = {"1": 2}
+        client_with_session.post("/1/solve", data={1: 1})
+
+    with app.app_context():
+        quiz_session = get_db().execute("SELECT * FROM quiz_session WHERE id = 2").fetchone()
+        assert quiz_session['status'] == 'completed' and quiz_session['finished'] is not None
+
+    with client as client_with_session:
+        with client_with_session.session_transaction() as sess:
+            sess['quiz_sessions'] = {"1": 2}
+        response = client_with_session.post("/1/solve", data={1: 2})
+    assert response.status_code == 409, "Submitted session should not be submitted again"
+    assert client.post("/1/solve", data={1: 2}).status_code == 409, "Session should be started before submitting"
+    with app.app_context():
+        assert get_db().execute("SELECT COUNT(*) FROM quiz_result WHERE quiz_session_id = 2").fetchone()[0] == 1
+        assert QuizResult.get_score(user_id=2, session_id=2) == (1, 1)
+
+
+def test_solve_sessions_by_quiz(client, auth, app):
+    with app.app_context():
+        other_quiz_id = Quiz(author_id=1, name="Other Quiz", questions=[
+            Question(text="Other Question", options={"a": True, "b": False})]).add_to_db()
+
+    auth.login_as_user()
+    with client as client_with_session:
+        client_with_session.get("/1/solve")
+        client_with_session.get(f"/{other_quiz_id}/solve")
+        assert session['quiz_sessions'] == {"1": 2, str(other_quiz_id): 3}
+    with app.app_context():
+        answer_id = Quiz.from_quiz_id(other_quiz_id).questions[0].options[0].answer_id
+        question_id = Quiz.from_quiz_id(other_quiz_id).questions[0].question_id
+    assert b"1 out of 1" in client.post(f"/{other_quiz_id}/solve", data={question_id: answer_id}).data
+
+    with app.app_context():
+        rows = get_db().execute("SELECT id, quiz_id, status FROM quiz_session WHERE id IN (2, 3) ORDER BY id") \
+            .fetchall()
+        assert [tuple(row) for row in rows] == [(2, 1, "in_progress"), (3, other_quiz_id, "completed")], \
+            "Answers of a quiz should be stored to the session of that quiz"
+
+
+def test_edit_keeps_ids(client, auth, app):
+    auth.login()
+    data = {
+        "Test Index Quiz": {
+            "Test Question": {"option1": False, "option2": True, "option3": False, "option3 (fixed)": False},
+            "New Question": {"1": True, "2": False}
+        }
+    }
+    client.post("/1/edit", data=json.dumps(data), content_type='application/json')
+
+    with app.app_context():
+        quiz = Quiz.from_quiz_id(1)
+        assert quiz.version == 2
+        assert [question.text for question in quiz.questions] == ["Test Question", "New Question"]
+        question = quiz.questions[0]
+        assert question.question_id == 1, "Question with the same text should keep its ID"
+        assert [option.answer_id for option in question.options] == [1, 2, 3, 5], \
+            "Options with the same text should keep their IDs, changed option should get a new one"
+        assert question.answer_id == 2
+        assert [option.text for option in quiz.questions[1].options] == ["1", "2"]
+        assert QuizResult.calculate_answers(quiz_id=1, user_id=2, session_id=1) == (1, 2), \
+            "Stored results should still point to the edited question"
+
+
+def test_edit_does_not_reuse_ids(client, auth, app):
+    auth.login()
+    data = {"Test Index Quiz": {"Other Question": {"option1": True, "option2": False}}}
+    client.post("/1/edit", data=json.dumps(data), content_type='application/json')
+
+    with app.app_context():
+        question = Quiz.from_quiz_id(1).questions[0]
+        assert question.question_id != 1, "Changed question should be added as a new row"
+        assert not {option.answer_id for option in question.options} & {1, 2, 3, 4}
+        db = get_db()
+        assert db.execute("SELECT COUNT(*) FROM questions WHERE id = 1").fetchone()[0] == 0
+        assert db.execute("SELECT COUNT(*) FROM answer_options WHERE id <= 4").fetchone()[0] == 0
+        assert QuizResult.calculate_answers(quiz_id=1, user_id=2, session_id=1) == (0, 1), \
+            "Stored results should not point to other content"
+
+
+def test_update_in_db_concurrent_edit(app):
+    with app.app_context():
+        first, second = Quiz.from_quiz_id(1), Quiz.from_quiz_id(1)
+        assert first.update_in_db(Quiz(author_id=1, name="First", questions=first.questions))
+        with pytest.raises(ValueError):
+            second.update_in_db(Quiz(author_id=1, name="Second", questions=[
+                Question(text="Other Question", options={"a": True, "b": False})]))
+        quiz = Quiz.from_quiz_id(1)
+        assert quiz.name == "First" and [question.text for question in quiz.questions] == ["Test Question"], \
+            "Edit of an outdated version should be rolled back"
+
+
+def test_update_in_db(app):
+    def content(quiz):
+        return [(question.text, [(option.text, option.checked) for option in question.options])
+                for question in quiz.questions]
+
+    with app.app_context():
+        questions = [Question(text=f"Question {index}", options={f"{index}.{option}": option == 0 for option in range(4)})
+                     for index in range(50)]
+        quiz = Quiz.from_quiz_id(Quiz(author_id=1, name="Big Quiz", questions=questions).add_to_db())
+
+        statements = []
+        db = get_db()
+        db.set_trace_callback(statements.append)
+        new_questions = [Question(text=question.text, options={option.text: option.checked
+                                                               for option in question.options})
+                         for question in quiz.questions]
+        new_questions[10].options[0].checked, new_questions[10].options[1].checked = False, True
+        new_quiz = Quiz(author_id=1, name="Big Quiz", questions=new_questions)
+        assert quiz.update_in_db(new_quiz)
+        db.set_trace_callback(None)
+        assert [statement for statement in statements if statement.startswith(("INSERT", "UPDATE", "DELETE"))] == \
+               [f"UPDATE questions SET answer_id = {quiz.questions[10].options[1].answer_id} "
+                f"WHERE id = {quiz.questions[10].question_id}",
+                f"UPDATE quizzes SET name = 'Big Quiz', version = version + 1 "
+                f"WHERE id = {quiz.quiz_id} AND version = 1"]
+
+        quiz = Quiz.from_quiz_id(quiz.quiz_id)
+        new_questions = [Question(text=question.text, options={option.text: option.checked
+                                                               for option in question.options})
+                         for question in reversed(quiz.questions[1:])]
+        new_questions[0].options = [new_questions[0].options[1], new_questions[0].options[0],
+                                    AnswerOption(text="Added", checked=False)]
+        new_questions.insert(5, Question(text="Inserted", options={"a": False, "b": True}))
+        new_quiz = Quiz(author_id=1, name="Big Quiz (edited)", questions=new_questions)
+        assert quiz.update_in_db(new_quiz)
+
+        edited = Quiz.from_quiz_id(quiz.quiz_id)
+        assert edited.name == "Big Quiz (edited)" and edited.version == 3
+        assert content(edited) == content(new_quiz)
+        assert db.execute("SELECT COUNT(*) FROM questions WHERE id = ?", (quiz.questions[0].question_id,)) \
+            .fetchone()[0] == 0, "Removed question should be deleted"
+        assert edited.questions[5].question_id > max(question.question_id for question in quiz.questions), \
+            "Inserted question should get a new row instead of reusing the removed one"
+        assert db.execute("SELECT COUNT(*) FROM answer_options").fetchone()[0] == 4 + 50 * 4 - 4 - 2 + 1 + 2
+        assert not edited.update_in_db(Quiz(author_id=1, name=edited.name, questions=[
+            Question(text=question.text, options={option.text: option.checked for option in question.options})
+            for question in edited.questions])), "Saving the same content should not change the quiz"
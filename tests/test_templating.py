@@ -0,0 +1,41 @@
+import json
+import os
+
+from quizzer import create_app
+from quizzer.db import dispose_pool
+
+
+def test_solve_fragment_cache(client, auth, app):
+    auth.login_as_user()
+    first = client.get("/1/solve").data
+    second = client.get("/1/solve").data
+    assert first == second
+    assert app.extensions["fragment_cache"].hits == 1, "Questions of the quiz should be rendered once"
+    assert client.get("/1/solve", headers={"Accept-Language": "ru"}).status_code == 200
+    assert app.extensions["fragment_cache"].hits == 1, "Fragments should be cached per language"
+
+    auth.logout()
+    auth.login()
+    data = {"Test Index Quiz": {"Edited Question": {"1": True, "2": False}}}
+    client.post("/1/edit", data=json.dumps(data), content_type="application/json")
+    auth.logout()
+    auth.login_as_user()
+    assert b"Edited Question" in client.get("/1/solve").data, "Edited quiz should not be rendered from the cache"
+
+
+def test_index_fragment_cache(client, auth, app):
+    auth.login_as_user()
+    client.get("/")
+    auth.logout()
+    auth.login()
+    response = client.get("/")
+    assert b'action="/1/edit"' in response.data, "Author should not get the cached item of a student"
+
+
+def test_precompile_templates(app, tmp_path):
+    cache_dir = str(tmp_path / "templates")
+    app = create_app({"TESTING": True, "DATABASE": app.config["DATABASE"],
+                      "TEMPLATE_BYTECODE_CACHE_DIR": cache_dir, "TEMPLATE_PRECOMPILE": True})
+    assert os.listdir(cache_dir), "Compiled templates should be stored on disk"
+    assert app.test_client().get("/").status_code == 200
+    dispose_pool(app)
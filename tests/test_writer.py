@@ -0,0 +1,129 @@
+import json
+import sqlite3
+
+import pytest
+
+from quizzer import create_app
+from quizzer.db import dispose_pool, get_db
+from quizzer.quizzes import Quiz, QuizResult
+from quizzer.writer import WriteBehindQueue, replay_spilled
+
+
+@pytest.fixture
+def write_behind_app(app):
+    app = create_app({"TESTING": True, "DATABASE": app.config["DATABASE"], "RESULT_WRITE_BEHIND": True,
+                      "RESULT_WRITE_INTERVAL": 0.05})
+    yield app
+    app.extensions["result_writer"].drain()
+    dispose_pool(app)
+
+
+def test_solve_write_behind(write_behind_app):
+    client = write_behind_app.test_client()
+    client.post("/auth/login", data={"username": "user", "password": "user"})
+    client.get("/1/solve")
+    response = client.post("/1/solve", data={"1": "1"})
+    assert b"Correct answers: 1 out of 1" in response.data, "Score should be returned before results are written"
+
+    write_behind_app.extensions["result_writer"].flush()
+    with write_behind_app.app_context():
+        assert QuizResult.get_score(user_id=2, session_id=2) == (1, 1)
+        assert get_db().execute("SELECT status FROM quiz_session WHERE id = 2").fetchone()[0] == "completed"
+
+
+def test_write_behind_batches(app):
+    batches = []
+    writer = WriteBehindQueue(app, write_batch=batches.append, batch_size=3, interval=1)
+    for item in range(5):
+        writer.submit(item)
+    writer.drain()
+    assert batches == [[0, 1, 2], [3, 4]], "Items should be written in batches of limited size"
+    writer.drain()
+
+
+def test_write_behind_retries_items_of_failed_batch(app, tmp_path):
+    written = []
+
+    def write_batch(items):
+        if "bad" in items:
+            raise ValueError(items)
+        written.extend(items)
+
+    spill_path = tmp_path / "spill.ndjson"
+    writer = WriteBehindQueue(app, write_batch=write_batch, batch_size=3, interval=0.05, spill_path=str(spill_path))
+    for item in ("first", "bad", "second"):
+        writer.submit(item)
+    writer.flush()
+    assert written == ["first", "second"], "Failed item should not lose other items of the batch"
+    assert spill_path.read_text().splitlines() == ['"bad"'], "Failed item should be spilled"
+    writer.drain()
+
+
+def test_write_behind_retries_locked_database(app, tmp_path):
+    written, failures = [], [sqlite3.OperationalError("database is locked")] * 3
+
+    def write_batch(items):
+        if failures:
+            raise failures.pop()
+        written.extend(items)
+
+    spill_path = tmp_path / "spill.ndjson"
+    writer = WriteBehindQueue(app, write_batch=write_batch, interval=0.05, spill_path=str(spill_path), retry_delay=0.01)
+    writer.submit("item")
+    writer.flush()
+    assert written == ["item"], "Transient errors should be retried"
+    assert not spill_path.exists()
+    writer.drain()
+
+
+@pytest.mark.parametrize("error, max_retries, attempts", [
+    (sqlite3.OperationalError("database is locked"), 2, 3),
+    (sqlite3.OperationalError("no such table: quiz_session_score"), 2, 1),
+])
+def test_write_behind_spills_after_retries(app, tmp_path, error, max_retries, attempts):
+    calls = []
+
+    def write_batch(items):
+        calls.append(items)
+        raise error
+
+    spill_path = tmp_path / "spill.ndjson"
+    writer = WriteBehindQueue(app, write_batch=write_batch, interval=0.05, spill_path=str(spill_path),
+                              retry_delay=0.01, max_retry_delay=0.01, max_retries=max_retries)
+    writer.submit("item")
+    writer.flush()
+    assert len(calls) == attempts, "Only transient errors should be retried and not more than max_retries times"
+    assert spill_path.read_text() == '"item"\n'
+    writer.drain()
+
+
+def test_write_behind_spills_on_drain(app, tmp_path):
+    def write_batch(items):
+        raise sqlite3.OperationalError("database is locked")
+
+    spill_path = tmp_path / "spill.ndjson"
+    writer = WriteBehindQueue(app, write_batch=write_batch, interval=0.05, spill_path=str(spill_path),
+                              retry_delay=0.01, max_retry_delay=0.01, drain_retries=2)
+    writer.submit([1, 2])
+    writer.drain()
+    assert [json.loads(line) for line in spill_path.read_text().splitlines()] == [[1, 2]], \
+        "Items that can't be written until the drain should be spilled"
+
+    written = []
+    with app.app_context():
+        assert replay_spilled(written.extend, str(spill_path)) == (1, 0)
+    assert written == [[1, 2]]
+    assert spill_path.read_text() == ""
+
+
+def test_replay_results_command(runner, app, tmp_path):
+    spill_path = tmp_path / "spill.ndjson"
+    spill_path.write_text(json.dumps([2, 1, 2, [[1, 1]], [1, 1]]) + "\n" + json.dumps([2, 1, 3, [[1]], [1, 1]]) + "\n")
+    app.config["RESULT_SPILL_FILE"] = str(spill_path)
+    with app.app_context():
+        assert Quiz.create_session_for_user(user_id=2, quiz_id=1) == 2
+    result = runner.invoke(args=["replay-results"])
+    assert "Written 1 results, 1 results failed again." in result.output
+    assert len(spill_path.read_text().splitlines()) == 1, "Failed results should be kept in the spill file"
+    with app.app_context():
+        assert QuizResult.get_score(user_id=2, session_id=2) == (1, 1)